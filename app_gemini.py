@@ -149,9 +149,9 @@ if id_file is not None:
                                 width='stretch')
                     with col2:
                         if face_result.get('primary_face'):
-                            st.subheader('👤 Extracted Face (Passport Size)')
+                            st.subheader('👤 Extracted Face')
                             st.image(face_result['primary_face'], 
-                                caption='Extracted and resized to standard passport dimensions',
+                                caption='Face cropped from the ID card',
                                 width=300)
                     
                     # Show face comparison if passport provided
@@ -22,10 +22,10 @@ class DatabaseConnection:
         user: str = "root",
         password: str = "",
         database: str = "IDverification",
-        pool_size: int = 5,
+        pool_size: int = 20,
         max_overflow: int = 10,
         pool_timeout: int = 30,
-        pool_recycle: int = 3600
+        pool_recycle: int = 1800
     ):
         """
         Initialize database connection
@@ -39,7 +39,8 @@ class DatabaseConnection:
             pool_size: Number of connections to maintain in pool
             max_overflow: Maximum overflow connections
             pool_timeout: Timeout for getting connection from pool
-            pool_recycle: Connection recycle time in seconds
+            pool_recycle: Connection recycle time in seconds (kept below
+                MySQL's wait_timeout so stale sockets are never handed out)
         """
         self.host = host
         self.port = port
@@ -62,6 +63,7 @@ class DatabaseConnection:
             pool_timeout=pool_timeout,
             pool_recycle=pool_recycle,
             pool_pre_ping=True,  # Enable connection health checks
+            pool_reset_on_return='rollback',  # Clear open transactions on checkin
             echo=False,  # Set to True for SQL query logging
         )
         
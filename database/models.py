@@ -2,7 +2,7 @@
 SQLAlchemy models for ID Verification System
 """
 from datetime import datetime, timedelta
-from sqlalchemy import Column, String, DateTime, Float, Boolean, Integer, Text, ForeignKey, Index
+from sqlalchemy import Column, Computed, String, DateTime, Float, Boolean, Integer, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import uuid
@@ -140,7 +140,7 @@ class APIUsage(Base):
     # Token Usage
     input_tokens = Column(Integer)
     output_tokens = Column(Integer)
-    total_tokens = Column(Integer)
+    total_tokens = Column(Integer, Computed('input_tokens + output_tokens', persisted=True))  # Generated by MySQL
     
     # Cost Tracking
     estimated_cost_usd = Column(Float)
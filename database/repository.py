@@ -1,15 +1,81 @@
 """
 Repository pattern for database operations
 """
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+import copy
+from datetime import datetime
+from threading import Lock
+from typing import Callable, Iterator, List, Optional, Dict, Any
+from cachetools import TTLCache
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, text, update, inspect
 import uuid
 import json
 
 from .models import User, Submission, ValidationLog, APIUsage, AuditLog
 
+def _cutoff(days: int):
+    """
+    SQL expression for "now minus N days", evaluated by MySQL
+    
+    Uses the server clock (UTC) so every query shares one source of "now".
+    """
+    return func.date_sub(
+        func.utc_timestamp(),
+        text("INTERVAL :days DAY").bindparams(days=int(days))
+    )
+
+
+# Rows fetched per round-trip when streaming large log result sets
+STREAM_BATCH_SIZE = 500
+
+
+# Short-lived cache for dashboard aggregates (statistics / usage totals).
+# Writes drop the affected entries; everything lives in the bounded TTLCache.
+STATS_CACHE_TTL_SECONDS = 30
+_stats_cache = TTLCache(maxsize=1024, ttl=STATS_CACHE_TTL_SECONDS)
+_stats_version = 0  # Bumped by every invalidation
+_stats_lock = Lock()
+
+
+def _invalidate_stats(user_id: Optional[str] = None):
+    """Invalidate cached aggregates for a user and the system-wide totals"""
+    global _stats_version
+    with _stats_lock:
+        _stats_version += 1
+        stale = [key for key in _stats_cache if key[1] is None or key[1] == user_id]
+        for key in stale:
+            _stats_cache.pop(key, None)
+
+
+def _cached_stats(name: str, user_id: Optional[str], days: int,
+                  compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return a cached aggregate, computing and storing it on a miss
+    
+    Callers get a deep copy, so mutating the nested dicts (e.g.
+    id_type_breakdown) cannot corrupt the cached entry. A result is not
+    stored if a write invalidated the cache while it was being computed,
+    since it may predate that write.
+    """
+    key = (name, user_id, days)
+    with _stats_lock:
+        cached = _stats_cache.get(key)
+        version = _stats_version
+    if cached is not None:
+        return copy.deepcopy(cached)
+    
+    result = compute()
+    with _stats_lock:
+        if _stats_version == version:
+            _stats_cache[key] = copy.deepcopy(result)
+    return result
+
+
+def clear_stats_cache():
+    """Drop all cached aggregates"""
+    with _stats_lock:
+        _stats_cache.clear()
+
 
 class UserRepository:
     """Repository for User operations"""
@@ -50,11 +116,16 @@ class UserRepository:
         return query.all()
     
     def update_last_login(self, user_id: str):
-        """Update user's last login timestamp"""
-        user = self.get_by_id(user_id)
-        if user:
-            user.last_login = datetime.utcnow()
-            self.session.commit()
+        """
+        Update user's last login timestamp (single UPDATE, no SELECT)
+        
+        Runs in the caller's transaction; the caller commits.
+        """
+        self.session.execute(
+            update(User)
+            .where(User.user_id == user_id)
+            .values(last_login=func.utc_timestamp())
+        )
 
 
 class SubmissionRepository:
@@ -74,6 +145,7 @@ class SubmissionRepository:
         
         self.session.add(submission)
         self.session.commit()
+        _invalidate_stats(submission.user_id)
         return submission
     
     def get_by_id(self, submission_id: str) -> Optional[Submission]:
@@ -92,7 +164,7 @@ class SubmissionRepository:
     
     def get_recent(self, days: int = 7, limit: int = 100) -> List[Submission]:
         """Get recent submissions"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        cutoff_date = _cutoff(days)
         return self.session.query(Submission).filter(
             Submission.created_at >= cutoff_date,
             Submission.is_deleted == False
@@ -106,23 +178,69 @@ class SubmissionRepository:
                 setattr(submission, key, value)
             submission.updated_at = datetime.utcnow()
             self.session.commit()
+            _invalidate_stats(submission.user_id)
         return submission
     
     def soft_delete(self, submission_id: str) -> bool:
-        """Soft delete a submission"""
-        submission = self.get_by_id(submission_id)
-        if submission:
-            submission.is_deleted = True
-            submission.updated_at = datetime.utcnow()
-            self.session.commit()
-            return True
-        return False
+        """
+        Soft delete a submission
+        
+        Returns False if there is no live submission with this ID (missing
+        or already deleted), as get_by_id would.
+        """
+        live = (
+            Submission.submission_id == submission_id,
+            Submission.is_deleted == False
+        )
+        # Only the owner's ID is needed to invalidate their cached stats.
+        # MySQL has no UPDATE ... RETURNING, so take it from the session when
+        # the submission is already loaded and only query for it otherwise
+        owner_id = self._loaded_owner(submission_id)
+        if owner_id is None:
+            owner = self.session.query(Submission.user_id).filter(*live).first()
+            if owner is None:
+                return False
+            owner_id = owner.user_id
+        
+        result = self.session.execute(
+            update(Submission)
+            .where(*live)
+            .values(is_deleted=True, updated_at=func.utc_timestamp())
+        )
+        if not result.rowcount:
+            return False
+        
+        self.session.commit()
+        _invalidate_stats(owner_id)
+        return True
+    
+    def _loaded_owner(self, submission_id: str) -> Optional[str]:
+        """Owner of a submission already loaded in the session, without SQL"""
+        for obj in self.session.identity_map.values():
+            if not isinstance(obj, Submission):
+                continue
+            # Read loaded attributes only; expired ones would trigger a refresh
+            loaded = inspect(obj).dict
+            if loaded.get('submission_id') == submission_id:
+                return loaded.get('user_id')
+        return None
     
     def get_statistics(self, user_id: str = None, days: int = 30) -> Dict[str, Any]:
-        """Get validation statistics"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        """Get validation statistics (cached for STATS_CACHE_TTL_SECONDS)"""
+        return _cached_stats(
+            'submission_statistics', user_id, days,
+            lambda: self._compute_statistics(user_id, days)
+        )
+    
+    def _compute_statistics(self, user_id: str, days: int) -> Dict[str, Any]:
+        """Query validation statistics from the database"""
+        cutoff_date = _cutoff(days)
         
-        query = self.session.query(Submission).filter(
+        # Total and passed counts in a single scan via a conditional aggregate
+        query = self.session.query(
+            func.count(Submission.id).label('total'),
+            func.sum(case((Submission.validation_overall == True, 1), else_=0)).label('passed')
+        ).filter(
             Submission.created_at >= cutoff_date,
             Submission.is_deleted == False
         )
@@ -130,8 +248,9 @@ class SubmissionRepository:
         if user_id:
             query = query.filter(Submission.user_id == user_id)
         
-        total = query.count()
-        passed = query.filter(Submission.validation_overall == True).count()
+        row = query.one()
+        total = row.total or 0
+        passed = int(row.passed or 0)
         failed = total - passed
         
         # Get breakdown by ID type
@@ -185,13 +304,19 @@ class ValidationLogRepository:
             ValidationLog.submission_id == submission_id
         ).order_by(ValidationLog.validated_at).all()
     
-    def get_failed_validations(self, days: int = 7) -> List[ValidationLog]:
-        """Get failed validations"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+    def get_failed_validations(self, days: int = 7) -> Iterator[ValidationLog]:
+        """
+        Stream failed validations
+        
+        The result is unbounded, so rows come from a server-side cursor in
+        batches of STREAM_BATCH_SIZE. The iterator is single-pass and must be
+        consumed before the session closes (wrap in list() if needed).
+        """
+        cutoff_date = _cutoff(days)
         return self.session.query(ValidationLog).filter(
             ValidationLog.validated_at >= cutoff_date,
             ValidationLog.validation_result == False
-        ).all()
+        ).execution_options(stream_results=True).yield_per(STREAM_BATCH_SIZE)
 
 
 class APIUsageRepository:
@@ -211,18 +336,25 @@ class APIUsageRepository:
             model_name=model_name,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
-            total_tokens=input_tokens + output_tokens,
             estimated_cost_usd=estimated_cost,
             success=success,
             **kwargs
         )
         self.session.add(usage)
         self.session.commit()
+        _invalidate_stats(user_id)
         return usage
     
     def get_user_usage(self, user_id: str, days: int = 30) -> Dict[str, Any]:
-        """Get user's API usage statistics"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        """Get user's API usage statistics (cached for STATS_CACHE_TTL_SECONDS)"""
+        return _cached_stats(
+            'api_user_usage', user_id, days,
+            lambda: self._compute_user_usage(user_id, days)
+        )
+    
+    def _compute_user_usage(self, user_id: str, days: int) -> Dict[str, Any]:
+        """Query user's API usage statistics from the database"""
+        cutoff_date = _cutoff(days)
         
         usage_records = self.session.query(APIUsage).filter(
             APIUsage.user_id == user_id,
@@ -246,8 +378,15 @@ class APIUsageRepository:
         }
     
     def get_total_usage(self, days: int = 30) -> Dict[str, Any]:
-        """Get total system API usage"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        """Get total system API usage (cached for STATS_CACHE_TTL_SECONDS)"""
+        return _cached_stats(
+            'api_total_usage', None, days,
+            lambda: self._compute_total_usage(days)
+        )
+    
+    def _compute_total_usage(self, days: int) -> Dict[str, Any]:
+        """Query total system API usage from the database"""
+        cutoff_date = _cutoff(days)
         
         total_cost = self.session.query(func.sum(APIUsage.estimated_cost_usd)).filter(
             APIUsage.created_at >= cutoff_date
@@ -299,10 +438,17 @@ class AuditLogRepository:
             query = query.filter(AuditLog.severity == severity)
         return query.order_by(AuditLog.created_at.desc()).limit(limit).all()
     
-    def get_user_logs(self, user_id: str, days: int = 30) -> List[AuditLog]:
-        """Get user's audit logs"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+    def get_user_logs(self, user_id: str, days: int = 30) -> Iterator[AuditLog]:
+        """
+        Stream user's audit logs
+        
+        Unbounded like get_failed_validations: server-side cursor, batches of
+        STREAM_BATCH_SIZE, consume before the session closes.
+        """
+        cutoff_date = _cutoff(days)
         return self.session.query(AuditLog).filter(
             AuditLog.user_id == user_id,
             AuditLog.created_at >= cutoff_date
-        ).order_by(AuditLog.created_at.desc()).all()
+        ).order_by(AuditLog.created_at.desc()).execution_options(
+            stream_results=True
+        ).yield_per(STREAM_BATCH_SIZE)
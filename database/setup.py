@@ -15,6 +15,40 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def migrate_total_tokens(db) -> bool:
+    """
+    Convert api_usage.total_tokens to a stored generated column
+    
+    Tables created before the model declared it Computed() still have a
+    plain column, which SQLAlchemy now leaves out of INSERTs. MODIFY turns
+    it into input_tokens + output_tokens and fills in every existing row.
+    Does nothing if the column is already generated.
+    
+    Args:
+        db: DatabaseConnection
+    
+    Returns:
+        True if the column was converted
+    """
+    from sqlalchemy import text
+    
+    with db.engine.begin() as conn:
+        extra = conn.execute(text(
+            "SELECT EXTRA FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'api_usage' "
+            "AND COLUMN_NAME = 'total_tokens'"
+        )).scalar()
+        
+        if extra is None or 'GENERATED' in extra.upper():
+            return False
+        
+        conn.execute(text(
+            "ALTER TABLE api_usage MODIFY COLUMN total_tokens INT "
+            "GENERATED ALWAYS AS (input_tokens + output_tokens) STORED"
+        ))
+    return True
+
+
 def setup_database(
     host: str = "127.0.0.1",
     port: int = 3306,
@@ -58,6 +92,10 @@ def setup_database(
         db.create_tables()
         logger.info("Database tables created successfully")
         
+        # create_all leaves existing tables alone, so upgrade them in place
+        if migrate_total_tokens(db):
+            logger.info("Converted api_usage.total_tokens to a generated column")
+        
         # Print table summary
         logger.info("\n" + "="*50)
         logger.info("Database Setup Complete!")
@@ -9,6 +9,7 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent))
 
 from gemini_card_detector import detect_card_type
+from debug_helpers import find_ghana_image
 
 api_key = os.getenv('GEMINI_API_KEY')
 if not api_key:
@@ -16,9 +17,13 @@ if not api_key:
     sys.exit(1)
 
 # Get test image
-test_images = list(Path('training_data').rglob('*.jpg')) + list(Path('training_data').rglob('*.png'))
-test_img_path = [p for p in test_images if 'GHANA' in str(p).upper()][0]
+test_img_path = find_ghana_image()
+if test_img_path is None:
+    print("[FAIL] No Ghana Card image found under training_data")
+    sys.exit(1)
 img = Image.open(test_img_path)
+# Gemini downsamples internally; cap the upload at 1024px to save bandwidth
+img.thumbnail((1024, 1024), Image.LANCZOS)
 
 print(f"Testing detect_card_type directly")
 print(f"Image: {test_img_path}")
@@ -4,7 +4,6 @@ Debug Gemini API response for card detection
 import os
 from pathlib import Path
 from PIL import Image
-import base64
 import io
 import sys
 import json
@@ -12,6 +11,7 @@ import json
 sys.path.insert(0, str(Path(__file__).parent))
 
 import google.generativeai as genai
+from debug_helpers import find_ghana_image
 
 api_key = os.getenv('GEMINI_API_KEY')
 if not api_key:
@@ -21,17 +21,21 @@ if not api_key:
 genai.configure(api_key=api_key)
 
 # Get test image
-test_images = list(Path('training_data').rglob('*.jpg')) + list(Path('training_data').rglob('*.png'))
-test_img_path = [p for p in test_images if 'GHANA' in str(p).upper()][0]
+test_img_path = find_ghana_image()
+if test_img_path is None:
+    print("[FAIL] No Ghana Card image found under training_data")
+    sys.exit(1)
 img = Image.open(test_img_path)
+# Gemini downsamples internally; cap the upload at 1024px to save bandwidth
+img.thumbnail((1024, 1024), Image.LANCZOS)
 
-# Convert to base64
+# Encode as JPEG bytes (the SDK accepts raw bytes, no base64 needed)
 buffered = io.BytesIO()
-img.save(buffered, format="JPEG")
-img_base64 = base64.standard_b64encode(buffered.getvalue()).decode()
+img.save(buffered, format="JPEG", quality=85, optimize=True)
+img_bytes = buffered.getvalue()
 
 print(f"Image: {test_img_path}")
-print(f"Base64 length: {len(img_base64)}")
+print(f"JPEG size: {len(img_bytes)} bytes")
 
 # Test with exact same prompt as in gemini_card_detector.py
 prompt = """Analyze this identification card image and determine its type.
@@ -62,7 +66,7 @@ response = model.generate_content([
     prompt,
     {
         "mime_type": "image/jpeg",
-        "data": img_base64
+        "data": img_bytes
     }
 ])
 
@@ -70,15 +74,19 @@ print("RAW RESPONSE:")
 print(response.text)
 print("\n" + "="*60)
 
-# Parse JSON
+# Parse JSON: decode the first complete object starting at the first '{'
 json_start = response.text.find('{')
-json_end = response.text.rfind('}') + 1
+result = None
+
+if json_start != -1:
+    try:
+        result, json_end = json.JSONDecoder().raw_decode(response.text, json_start)
+    except json.JSONDecodeError:
+        result = None
 
-if json_start != -1 and json_end > json_start:
-    json_str = response.text[json_start:json_end]
+if result is not None:
     print("EXTRACTED JSON:")
-    print(json_str)
-    result = json.loads(json_str)
+    print(response.text[json_start:json_end])
     print("\nPARSED:")
     print(f"  Card Type: {result.get('card_type')}")
     print(f"  Confidence: {result.get('confidence')}")
@@ -0,0 +1,17 @@
+"""
+Shared helpers for the debug scripts
+"""
+import os
+from pathlib import Path
+
+
+def find_ghana_image(root='training_data'):
+    """Walk the training tree once and return the first Ghana Card image"""
+    for dirpath, _, files in os.walk(root):
+        for filename in files:
+            if not filename.lower().endswith(('.jpg', '.png')):
+                continue
+            path = Path(dirpath) / filename
+            if 'GHANA' in str(path).upper():
+                return path
+    return None
@@ -3,6 +3,7 @@ Diagnose available Gemini models and test API connectivity.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import google.generativeai as genai
@@ -36,20 +37,30 @@ model_names = [
     'gemini-pro-vision',          # Legacy vision model
 ]
 
-for model_name in model_names:
+
+def test_model(model_name):
+    """Probe a model with a text prompt and return the report lines"""
+    lines = [f"\nTesting: {model_name}"]
     try:
-        print(f"\nTesting: {model_name}")
         model = genai.GenerativeModel(model_name)
-        print(f"  ✓ Model loaded successfully")
+        lines.append(f"  ✓ Model loaded successfully")
         
         # Try to generate content with a simple text prompt
         response = model.generate_content("Hello")
-        print(f"  ✓ Content generation works")
-        print(f"  ✓ Response: {response.text[:50]}...")
+        lines.append(f"  ✓ Content generation works")
+        lines.append(f"  ✓ Response: {response.text[:50]}...")
         
     except Exception as e:
         error_msg = str(e)
-        print(f"  ✗ Failed: {error_msg[:100]}")
+        lines.append(f"  ✗ Failed: {error_msg[:100]}")
+    return lines
+
+
+# Probes are independent network calls, so run them concurrently and
+# print the reports in submission order once they have all finished
+with ThreadPoolExecutor(max_workers=len(model_names)) as executor:
+    for lines in executor.map(test_model, model_names):
+        print("\n".join(lines))
 
 print("\n" + "=" * 70)
 print("TESTING WITH VISION (IMAGE) SUPPORT")
@@ -71,22 +82,32 @@ vision_models = [
     'gemini-pro-vision',
 ]
 
-for model_name in vision_models:
+img_bytes = img_byte_arr.getvalue()
+
+
+def test_vision_model(model_name):
+    """Probe a model with an image prompt and return the report lines"""
+    lines = [f"\nTesting vision with: {model_name}"]
     try:
-        print(f"\nTesting vision with: {model_name}")
         model = genai.GenerativeModel(model_name)
         
         # Try to generate content with image
         response = model.generate_content([
             "What is in this image?",
-            {"mime_type": "image/png", "data": img_byte_arr.getvalue()}
+            {"mime_type": "image/png", "data": img_bytes}
         ])
-        print(f"  ✓ Vision API works")
-        print(f"  ✓ Response: {response.text[:50]}...")
+        lines.append(f"  ✓ Vision API works")
+        lines.append(f"  ✓ Response: {response.text[:50]}...")
         
     except Exception as e:
         error_msg = str(e)
-        print(f"  ✗ Failed: {error_msg[:100]}")
+        lines.append(f"  ✗ Failed: {error_msg[:100]}")
+    return lines
+
+
+with ThreadPoolExecutor(max_workers=len(vision_models)) as executor:
+    for lines in executor.map(test_vision_model, vision_models):
+        print("\n".join(lines))
 
 print("\n" + "=" * 70)
 print("RECOMMENDATIONS")
@@ -3,12 +3,19 @@ Custom exceptions for the ID Verification system.
 Provides structured error handling with error codes and details.
 """
 
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
+
+# Shared read-only details mapping for exceptions raised without details
+_EMPTY_DETAILS: Mapping[str, Any] = MappingProxyType({})
 
 
 class IDVerificationError(Exception):
     """Base exception for ID verification system."""
     
+    # Attributes live in slots so raising does not allocate an instance dict
+    __slots__ = ('code', 'message', 'details', 'user_message')
+    
     def __init__(
         self,
         code: str,
@@ -27,7 +34,7 @@ class IDVerificationError(Exception):
         """
         self.code = code
         self.message = message
-        self.details = details or {}
+        self.details = details if details is not None else _EMPTY_DETAILS
         self.user_message = user_message or message
         super().__init__(self.message)
     
@@ -37,7 +44,7 @@ class IDVerificationError(Exception):
             'error_code': self.code,
             'error_message': self.message,
             'user_message': self.user_message,
-            'details': self.details
+            'details': dict(self.details)
         }
     
     def __str__(self) -> str:
@@ -46,37 +53,42 @@ class IDVerificationError(Exception):
 
 class APIError(IDVerificationError):
     """Raised when API call fails."""
-    pass
+    __slots__ = ()
+
+
+class CircuitOpenError(APIError):
+    """Raised instead of calling a service whose circuit breaker is open."""
+    __slots__ = ()
 
 
 class CardDetectionError(IDVerificationError):
     """Raised when card detection fails."""
-    pass
+    __slots__ = ()
 
 
 class TextExtractionError(IDVerificationError):
     """Raised when text extraction fails."""
-    pass
+    __slots__ = ()
 
 
 class ValidationError(IDVerificationError):
     """Raised when validation fails."""
-    pass
+    __slots__ = ()
 
 
 class ConfigurationError(IDVerificationError):
     """Raised when configuration is invalid."""
-    pass
+    __slots__ = ()
 
 
 class SecurityError(IDVerificationError):
     """Raised when security check fails."""
-    pass
+    __slots__ = ()
 
 
 class RateLimitError(IDVerificationError):
     """Raised when rate limit is exceeded."""
-    pass
+    __slots__ = ()
 
 
 # Error messages and codes
@@ -106,6 +118,11 @@ ERROR_CATALOG = {
         'user_message': 'Service error. Please try again.',
         'action': 'Retry the operation. If error persists, contact support.'
     },
+    'API_UNAVAILABLE': {
+        'message': 'Service temporarily unavailable after repeated failures',
+        'user_message': 'The verification service is temporarily unavailable. Please try again shortly.',
+        'action': 'Wait a minute and try again. Contact support if the service stays unavailable.'
+    },
     'IMAGE_INVALID': {
         'message': 'Image could not be processed',
         'user_message': 'The uploaded image could not be read. Please ensure it is a valid image file.',
@@ -184,6 +201,14 @@ ERROR_CATALOG = {
 }
 
 
+# Column-oriented view of ERROR_CATALOG for create_error: one dict lookup
+# for the code's row index, then plain tuple indexing per field
+_CODE_INDEX = {code: i for i, code in enumerate(ERROR_CATALOG)}
+_MESSAGES = tuple(entry['message'] for entry in ERROR_CATALOG.values())
+_USER_MESSAGES = tuple(entry['user_message'] for entry in ERROR_CATALOG.values())
+_UNKNOWN_INDEX = _CODE_INDEX['UNKNOWN_ERROR']
+
+
 def create_error(
     code: str,
     message: Optional[str] = None,
@@ -202,16 +227,16 @@ def create_error(
     Returns:
         Configured exception instance
     """
-    if code not in ERROR_CATALOG:
+    i = _CODE_INDEX.get(code)
+    if i is None:
         code = 'UNKNOWN_ERROR'
-    
-    catalog_entry = ERROR_CATALOG[code]
+        i = _UNKNOWN_INDEX
     
     return exception_class(
         code=code,
-        message=message or catalog_entry['message'],
-        details=details or {},
-        user_message=catalog_entry['user_message']
+        message=message or _MESSAGES[i],
+        details=details,
+        user_message=_USER_MESSAGES[i]
     )
 
 
@@ -9,25 +9,135 @@ Provides multiple face detection and comparison methods:
 5. Feature-based matching (ORB, SIFT)
 """
 
-import cv2
 import numpy as np
 from PIL import Image
-from typing import Tuple, Dict, Optional, List
+from typing import Tuple, Dict, Optional, List, Union
 import os
+import threading
+from functools import cached_property
 
-# Import optional libraries
-try:
-    from skimage.metrics import structural_similarity as ssim
-    _have_skimage = True
-except ImportError:
-    _have_skimage = False
+# OpenCV is imported on first use so that processes which never compare
+# faces do not pay its import time and memory
+cv2 = None
 
-try:
-    import imutils
-    from imutils import face_utils
-    _have_imutils = True
-except ImportError:
-    _have_imutils = False
+# Longest image side used for Haar detection; larger inputs are downscaled
+HAAR_MAX_DIMENSION = 640
+
+# Ensemble weighting; the overall score is normalized by the weights of the
+# metrics that actually ran
+ENSEMBLE_WEIGHTS = {'histogram': 1.0, 'ssim': 1.0, 'features': 1.0}
+
+# Minimum overall similarity for two faces to be considered a match
+MATCH_THRESHOLD = 0.6
+
+# Lowe's ratio for accepting an ORB match over its second-best candidate
+ORB_RATIO_TEST = 0.75
+
+
+def _features_cannot_change_match(scores: Dict[str, float], threshold: float) -> bool:
+    """
+    Whether the ensemble decision is already fixed without the feature score.
+    
+    Feature similarity lies in [0, 1], so the full ensemble score lies
+    between the weighted means with features at 0 and at 1. If both ends
+    fall on the same side of the threshold, ORB matching cannot change it.
+    
+    Args:
+        scores: Metric scores computed so far (without 'features')
+        threshold: Match threshold for the overall score
+        
+    Returns:
+        True if the match decision is the same for any feature score
+    """
+    feature_weight = ENSEMBLE_WEIGHTS['features']
+    total_weight = feature_weight + sum(ENSEMBLE_WEIGHTS[name] for name in scores)
+    partial = sum(ENSEMBLE_WEIGHTS[name] * score for name, score in scores.items())
+    
+    lowest = partial / total_weight
+    highest = (partial + feature_weight) / total_weight
+    return lowest >= threshold or highest < threshold
+
+
+def _load_cv2():
+    """Import OpenCV on first use and bind it to the module-level name."""
+    global cv2
+    if cv2 is None:
+        import cv2 as _cv2
+        cv2 = _cv2
+    return cv2
+
+
+def _gaussian_kernel(size: int, sigma: float) -> np.ndarray:
+    """Normalized 1-D Gaussian kernel (same as cv2.getGaussianKernel)."""
+    x = np.arange(size, dtype=np.float32) - (size - 1) / 2.0
+    kernel = np.exp(-(x * x) / (2.0 * sigma * sigma))
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+# 11-tap, sigma 1.5 window used by SSIM
+_SSIM_KERNEL = _gaussian_kernel(11, 1.5)
+
+
+def _ssim(gray1: np.ndarray, gray2: np.ndarray) -> float:
+    """
+    Mean SSIM of two equally sized uint8 grayscale images (Wang et al., 2004).
+    
+    Uses an 11x11 Gaussian window (sigma 1.5) applied as a separable filter,
+    and the standard constants for 8-bit data. The uint8 inputs are filtered
+    and multiplied directly into float32 outputs, so no float copies of the
+    images are made.
+    """
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    
+    def blur(image):
+        return cv2.sepFilter2D(
+            image, cv2.CV_32F, _SSIM_KERNEL, _SSIM_KERNEL,
+            borderType=cv2.BORDER_REFLECT_101
+        )
+    
+    mu1 = blur(gray1)
+    mu2 = blur(gray2)
+    mu1_sq = mu1 * mu1
+    mu2_sq = mu2 * mu2
+    mu1_mu2 = mu1 * mu2
+    
+    sigma1_sq = blur(cv2.multiply(gray1, gray1, dtype=cv2.CV_32F)) - mu1_sq
+    sigma2_sq = blur(cv2.multiply(gray2, gray2, dtype=cv2.CV_32F)) - mu2_sq
+    sigma12 = blur(cv2.multiply(gray1, gray2, dtype=cv2.CV_32F)) - mu1_mu2
+    
+    ssim_map = ((2 * mu1_mu2 + c1) * (2 * sigma12 + c2)) / (
+        (mu1_sq + mu2_sq + c1) * (sigma1_sq + sigma2_sq + c2)
+    )
+    return float(ssim_map.mean())
+
+
+def _as_array(image: Union[Image.Image, np.ndarray]) -> Tuple[np.ndarray, bool]:
+    """Return (array, is_rgb): PIL images as RGB views, arrays as BGR."""
+    if isinstance(image, np.ndarray):
+        return image, False
+    # RGBA (PNG uploads), L and P images would otherwise reach the
+    # detectors and histogram as 4-channel or 2-D arrays
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image), True
+
+
+def _to_gray(image: np.ndarray, rgb: bool = False) -> np.ndarray:
+    """Convert a BGR (default) or RGB image to grayscale."""
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY)
+
+
+def _color_histogram(image: np.ndarray) -> np.ndarray:
+    """
+    L1-normalized 8x8x8 color histogram of a 3-channel uint8 image.
+    
+    Each pixel maps to one of 512 bins by keeping the top 3 bits per channel.
+    """
+    pixels = image.reshape(-1, 3) >> 5
+    idx = (pixels[:, 0].astype(np.int32) << 6) | (pixels[:, 1] << 3) | pixels[:, 2]
+    hist = np.bincount(idx, minlength=512).astype(np.float32)
+    return hist / hist.sum()
 
 
 class FaceComparator:
@@ -35,15 +145,70 @@ class FaceComparator:
     Advanced face comparison using multiple techniques.
     """
     
-    def __init__(self):
-        """Initialize face detection models."""
-        # Load Haar Cascade (lightweight, always available)
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+    def __init__(self, use_opencl: Optional[bool] = None):
+        """
+        Initialize the comparator.
+        
+        The Haar cascade and DNN detector are loaded lazily on first access,
+        so callers that only compare pre-cropped faces never parse them.
+        
+        Args:
+            use_opencl: Run Haar detection and the DNN forward pass through
+                OpenCV's OpenCL backend when a device is available. Defaults
+                to the FACE_COMPARISON_OPENCL environment variable (off).
+        """
+        _load_cv2()
+        
+        if use_opencl is None:
+            use_opencl = os.getenv('FACE_COMPARISON_OPENCL', 'false').lower() == 'true'
+        self.use_opencl = bool(use_opencl) and cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+        
+        # Feature matcher objects are reused across comparisons; OpenCV
+        # detectors are not reentrant, so access is serialized by a lock
+        self.orb = cv2.ORB_create(nfeatures=250, fastThreshold=20)
+        self.bf = cv2.BFMatcher(cv2.NORM_HAMMING)
+        self._orb_lock = threading.Lock()
+        self._dnn_lock = threading.Lock()
+        
+        # Per-thread resize output buffers and Haar cascades, see
+        # _resize_buffers() and face_cascade
+        self._local = threading.local()
+    
+    def _resize_buffers(self, shape: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return a pair of reusable uint8 buffers of the given shape.
+        
+        Buffers are kept per thread so the shared comparator stays safe to use
+        concurrently. Inputs of another dtype make cv2.resize allocate as usual.
+        """
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        pair = buffers.get(shape)
+        if pair is None:
+            pair = buffers[shape] = (np.empty(shape, np.uint8), np.empty(shape, np.uint8))
+        return pair
+    
+    @property
+    def face_cascade(self):
+        """
+        Haar Cascade face detector (lightweight, always available), loaded on first use.
         
-        # Try to load DNN face detector (better accuracy)
-        self.dnn_model = None
+        Each thread gets its own copy, since detectMultiScale is not safe to
+        call concurrently on one CascadeClassifier.
+        """
+        cascade = getattr(self._local, 'face_cascade', None)
+        if cascade is None:
+            cascade = self._local.face_cascade = cv2.CascadeClassifier(
+                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            )
+        return cascade
+    
+    @cached_property
+    def dnn_model(self):
+        """DNN face detector (better accuracy) loaded on first use, or None if unavailable."""
         try:
             model_path = cv2.data.haarcascades.replace('haarcascades', 'data')
             prototxt = os.path.join(model_path, 'deploy.prototxt')
@@ -52,68 +217,131 @@ class FaceComparator:
             # Alternative: try local paths or download
             if not os.path.exists(prototxt):
                 # Model files not found, will use Haar Cascade only
-                pass
-            else:
-                self.dnn_model = cv2.dnn.readNetFromCaffe(prototxt, caffemodel)
+                return None
+            net = cv2.dnn.readNetFromCaffe(prototxt, caffemodel)
+            if self.use_opencl:
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL)
+            
+            # One forward pass on a blank blob pays the backend's one-time
+            # initialization here instead of on the first real detection
+            net.setInput(np.zeros((1, 3, 300, 300), np.float32))
+            net.forward()
+            return net
         except Exception:
-            pass  # Fall back to Haar Cascade
+            return None  # Fall back to Haar Cascade
     
-    def detect_faces_haar(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    def warm_up(self):
+        """Load the detectors now so the first comparison does not pay for it."""
+        self.face_cascade
+        self.dnn_model
+    
+    def detect_faces_haar(self, image: np.ndarray, rgb: bool = False) -> List[Tuple[int, int, int, int]]:
         """
         Detect faces using Haar Cascade.
         
         Args:
             image: Input image as numpy array (BGR format)
+            rgb: True if the image is in RGB channel order
             
         Returns:
             List of (x, y, w, h) tuples for detected faces
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = _to_gray(image, rgb)
+        
+        # Detect on a bounded-size copy; cascade cost scales with pixel count
+        scale = HAAR_MAX_DIMENSION / max(gray.shape[:2])
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+        
+        if self.use_opencl:
+            gray = cv2.UMat(gray)
+        
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=1.1,
             minNeighbors=5,
             minSize=(30, 30)
         )
-        return [(x, y, w, h) for (x, y, w, h) in faces]
+        return [
+            (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+            for (x, y, w, h) in faces
+        ]
     
-    def detect_faces_dnn(self, image: np.ndarray, confidence_threshold: float = 0.5) -> List[Tuple[int, int, int, int]]:
+    def detect_faces_dnn(
+        self,
+        image: np.ndarray,
+        confidence_threshold: float = 0.5,
+        rgb: bool = False
+    ) -> List[Tuple[int, int, int, int]]:
         """
         Detect faces using DNN model (if available).
         
         Args:
             image: Input image as numpy array (BGR format)
             confidence_threshold: Minimum confidence for detection
+            rgb: True if the image is in RGB channel order
             
         Returns:
             List of (x, y, w, h) tuples for detected faces
         """
         if self.dnn_model is None:
-            return self.detect_faces_haar(image)
+            return self.detect_faces_haar(image, rgb=rgb)
+        
+        return self._detect_faces_dnn_batch([image], confidence_threshold, rgb)[0]
+    
+    def _detect_faces_dnn_batch(
+        self,
+        images: List[np.ndarray],
+        confidence_threshold: float = 0.5,
+        rgb: bool = False
+    ) -> List[List[Tuple[int, int, int, int]]]:
+        """
+        Run one DNN forward pass over several images.
         
-        (h, w) = image.shape[:2]
-        blob = cv2.dnn.blobFromImage(
-            cv2.resize(image, (300, 300)), 1.0,
-            (300, 300), (104.0, 177.0, 123.0)
+        Returns one list of (x, y, w, h) boxes per input image. Requires the
+        DNN model to be loaded.
+        """
+        # Resize into reusable per-thread buffers (a pair covers the
+        # two-image batch used by compare_faces)
+        buffers = self._resize_buffers((300, 300, 3)) if len(images) <= 2 else ()
+        resized = [
+            cv2.resize(image, (300, 300), dst=buffers[i] if i < len(buffers) else None)
+            for i, image in enumerate(images)
+        ]
+        
+        # The model expects BGR; swapRB reorders RGB input so the means align
+        blob = cv2.dnn.blobFromImages(
+            resized, 1.0, (300, 300), (104.0, 177.0, 123.0), swapRB=rgb
         )
         
-        self.dnn_model.setInput(blob)
-        detections = self.dnn_model.forward()
+        with self._dnn_lock:
+            self.dnn_model.setInput(blob)
+            detections = self.dnn_model.forward()
         
-        faces = []
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            if confidence > confidence_threshold:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
-                faces.append((startX, startY, endX - startX, endY - startY))
+        # Filter all candidates at once; column 0 holds the batch index
+        det = detections[0, 0]
+        det = det[det[:, 2] > confidence_threshold]
         
-        return faces
+        results = []
+        for index, image in enumerate(images):
+            (h, w) = image.shape[:2]
+            boxes = det[det[:, 0] == index, 3:7]
+            boxes = (boxes * np.array([w, h, w, h], dtype=np.float32)).astype(np.int32)
+            boxes[:, 2:] -= boxes[:, :2]  # (startX, startY, endX, endY) -> (x, y, w, h)
+            results.append([tuple(box) for box in boxes.tolist()])
+        
+        return results
     
     def compare_histogram(self, face1: np.ndarray, face2: np.ndarray) -> float:
         """
         Compare faces using histogram correlation.
         
+        The distance is independent of channel order as long as both faces
+        use the same one, so BGR and RGB inputs are both accepted.
+        
         Args:
             face1, face2: Face images as numpy arrays
             
@@ -121,123 +349,125 @@ class FaceComparator:
             Distance score (0-1, lower is more similar)
         """
         # Resize to same size
-        face1 = cv2.resize(face1, (100, 100))
-        face2 = cv2.resize(face2, (100, 100))
+        buf1, buf2 = self._resize_buffers((100, 100, 3))
+        face1 = cv2.resize(face1, (100, 100), dst=buf1)
+        face2 = cv2.resize(face2, (100, 100), dst=buf2)
         
-        # Compute histograms
-        hist1 = cv2.calcHist([face1], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
-        hist2 = cv2.calcHist([face2], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
+        # Compute normalized 8x8x8 color histograms
+        hist1 = _color_histogram(face1)
+        hist2 = _color_histogram(face2)
         
-        # Normalize
-        hist1 = cv2.normalize(hist1, hist1).flatten()
-        hist2 = cv2.normalize(hist2, hist2).flatten()
-        
-        # Bhattacharyya distance (0 = identical, 1 = completely different)
-        distance = cv2.compareHist(hist1, hist2, cv2.HISTCMP_BHATTACHARYYA)
+        # Bhattacharyya distance (0 = identical, 1 = completely different),
+        # same definition as cv2.HISTCMP_BHATTACHARYYA
+        coefficient = float(np.sum(np.sqrt(hist1 * hist2)))
+        distance = float(np.sqrt(max(0.0, 1.0 - coefficient)))
         
         return distance
     
-    def compare_ssim(self, face1: np.ndarray, face2: np.ndarray) -> float:
+    def compare_ssim(self, face1: np.ndarray, face2: np.ndarray, rgb: bool = False) -> float:
         """
         Compare faces using Structural Similarity Index (SSIM).
         
         Args:
-            face1, face2: Face images as numpy arrays
+            face1, face2: Face images as numpy arrays (BGR format)
+            rgb: True if the faces are in RGB channel order
             
         Returns:
             Similarity score (0-1, higher is more similar)
         """
-        if not _have_skimage:
-            # Fallback to histogram comparison
-            return 1.0 - self.compare_histogram(face1, face2)
-        
+        return self._compare_ssim_gray(_to_gray(face1, rgb), _to_gray(face2, rgb))
+    
+    def _compare_ssim_gray(self, gray1: np.ndarray, gray2: np.ndarray) -> float:
+        """SSIM on grayscale face crops of any size."""
         # Resize to same size
-        face1 = cv2.resize(face1, (100, 100))
-        face2 = cv2.resize(face2, (100, 100))
-        
-        # Convert to grayscale
-        gray1 = cv2.cvtColor(face1, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(face2, cv2.COLOR_BGR2GRAY)
+        buf1, buf2 = self._resize_buffers((100, 100))
+        gray1 = cv2.resize(gray1, (100, 100), dst=buf1)
+        gray2 = cv2.resize(gray2, (100, 100), dst=buf2)
         
         # Compute SSIM
-        score = ssim(gray1, gray2)
+        score = _ssim(gray1, gray2)
         
         return score
     
-    def compare_features(self, face1: np.ndarray, face2: np.ndarray) -> float:
+    def compare_features(self, face1: np.ndarray, face2: np.ndarray, rgb: bool = False) -> float:
         """
         Compare faces using ORB feature matching.
         
         Args:
-            face1, face2: Face images as numpy arrays
+            face1, face2: Face images as numpy arrays (BGR format)
+            rgb: True if the faces are in RGB channel order
             
         Returns:
             Similarity score (0-1, higher is more similar)
         """
+        return self._compare_features_gray(_to_gray(face1, rgb), _to_gray(face2, rgb))
+    
+    def _compare_features_gray(self, gray1: np.ndarray, gray2: np.ndarray) -> float:
+        """ORB feature similarity on grayscale face crops of any size."""
         # Resize to same size
-        face1 = cv2.resize(face1, (200, 200))
-        face2 = cv2.resize(face2, (200, 200))
-        
-        # Convert to grayscale
-        gray1 = cv2.cvtColor(face1, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(face2, cv2.COLOR_BGR2GRAY)
-        
-        # Initialize ORB detector
-        orb = cv2.ORB_create(nfeatures=500)
-        
-        # Detect keypoints and descriptors
-        kp1, des1 = orb.detectAndCompute(gray1, None)
-        kp2, des2 = orb.detectAndCompute(gray2, None)
-        
-        if des1 is None or des2 is None or len(des1) < 2 or len(des2) < 2:
-            return 0.0
-        
-        # Match descriptors using BFMatcher
-        bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-        matches = bf.match(des1, des2)
-        
-        # Sort matches by distance
-        matches = sorted(matches, key=lambda x: x.distance)
+        buf1, buf2 = self._resize_buffers((200, 200))
+        gray1 = cv2.resize(gray1, (200, 200), dst=buf1)
+        gray2 = cv2.resize(gray2, (200, 200), dst=buf2)
+        
+        with self._orb_lock:
+            # Detect keypoints and descriptors
+            kp1, des1 = self.orb.detectAndCompute(gray1, None)
+            kp2, des2 = self.orb.detectAndCompute(gray2, None)
+            
+            if des1 is None or des2 is None or len(des1) < 2 or len(des2) < 2:
+                return 0.0
+            
+            # Two nearest neighbours per descriptor for the ratio test
+            matches = self.bf.knnMatch(des1, des2, k=2)
         
         # Calculate similarity score
         if len(matches) == 0:
             return 0.0
         
-        # Good matches are those with low distance
-        good_matches = [m for m in matches if m.distance < 50]
+        # Good matches are clearly closer than the runner-up (Lowe's ratio test)
+        good_matches = [
+            pair[0] for pair in matches
+            if len(pair) == 2 and pair[0].distance < ORB_RATIO_TEST * pair[1].distance
+        ]
         similarity = len(good_matches) / max(len(kp1), len(kp2))
         
         return min(similarity, 1.0)
     
     def compare_faces(
         self,
-        pil_img1: Image.Image,
-        pil_img2: Image.Image,
+        pil_img1: Union[Image.Image, np.ndarray],
+        pil_img2: Union[Image.Image, np.ndarray],
         method: str = 'ensemble'
     ) -> Tuple[bool, float, Dict[str, float]]:
         """
         Compare two face images using specified method(s).
         
         Args:
-            pil_img1: First image (portrait)
-            pil_img2: Second image (ID card)
+            pil_img1: First image (portrait), PIL Image or BGR uint8 array
+            pil_img2: Second image (ID card), PIL Image or BGR uint8 array
             method: Comparison method - 'histogram', 'ssim', 'features', or 'ensemble'
             
         Returns:
             Tuple of (match_boolean, overall_score, method_scores_dict)
         """
-        # Convert PIL to OpenCV format
-        img1 = cv2.cvtColor(np.array(pil_img1), cv2.COLOR_RGB2BGR)
-        img2 = cv2.cvtColor(np.array(pil_img2), cv2.COLOR_RGB2BGR)
+        # PIL images are viewed as RGB arrays and decoded arrays are used as
+        # BGR; neither is copied, consumers below are told the channel order
+        img1, rgb = _as_array(pil_img1)
+        img2, rgb2 = _as_array(pil_img2)
+        if rgb2 != rgb:
+            img2 = cv2.cvtColor(img2, cv2.COLOR_BGR2RGB if rgb else cv2.COLOR_RGB2BGR)
+        
+        # Detect faces: one batched DNN pass for both images, Haar as fallback
+        if self.dnn_model is not None:
+            faces1, faces2 = self._detect_faces_dnn_batch([img1, img2], rgb=rgb)
+        else:
+            faces1, faces2 = [], []
         
-        # Detect faces
-        faces1 = self.detect_faces_dnn(img1)
         if len(faces1) == 0:
-            faces1 = self.detect_faces_haar(img1)
+            faces1 = self.detect_faces_haar(img1, rgb=rgb)
         
-        faces2 = self.detect_faces_dnn(img2)
         if len(faces2) == 0:
-            faces2 = self.detect_faces_haar(img2)
+            faces2 = self.detect_faces_haar(img2, rgb=rgb)
         
         if len(faces1) == 0 or len(faces2) == 0:
             return None, None, {'error': 'No faces detected'}
@@ -249,39 +479,57 @@ class FaceComparator:
         face1 = img1[y1:y1+h1, x1:x1+w1]
         face2 = img2[y2:y2+h2, x2:x2+w2]
         
+        # Grayscale each crop once, shared by the SSIM and feature paths;
+        # only the histogram path needs the color crops
+        use_ssim = method in ['ssim', 'ensemble']
+        use_features = method in ['features', 'ensemble']
+        if use_ssim or use_features:
+            gray1 = _to_gray(face1, rgb=rgb)
+            gray2 = _to_gray(face2, rgb=rgb)
+        
         # Compute similarity scores
         scores = {}
         
         if method in ['histogram', 'ensemble']:
             scores['histogram'] = 1.0 - self.compare_histogram(face1, face2)
         
-        if method in ['ssim', 'ensemble'] and _have_skimage:
-            scores['ssim'] = self.compare_ssim(face1, face2)
+        if use_ssim:
+            scores['ssim'] = self._compare_ssim_gray(gray1, gray2)
         
-        if method in ['features', 'ensemble']:
-            scores['features'] = self.compare_features(face1, face2)
+        # ORB matching is the most expensive metric; skip it in ensemble mode
+        # when no feature score could change the match decision
+        if method == 'ensemble' and _features_cannot_change_match(scores, MATCH_THRESHOLD):
+            use_features = False
+        
+        if use_features:
+            scores['features'] = self._compare_features_gray(gray1, gray2)
         
         # Calculate overall score
         if method == 'ensemble':
-            overall_score = np.mean(list(scores.values()))
+            total_weight = sum(ENSEMBLE_WEIGHTS[name] for name in scores)
+            overall_score = sum(
+                ENSEMBLE_WEIGHTS[name] * score for name, score in scores.items()
+            ) / total_weight
         else:
             overall_score = scores.get(method, 0.0)
         
         # Determine match
-        match_threshold = 0.6  # 60% similarity threshold
-        match = bool(overall_score >= match_threshold)
+        match = bool(overall_score >= MATCH_THRESHOLD)
         
         return match, overall_score, scores
 
 
 # Global instance
 _face_comparator = None
+_face_comparator_lock = threading.Lock()
 
 def get_face_comparator() -> FaceComparator:
     """Get or create global face comparator instance."""
     global _face_comparator
     if _face_comparator is None:
-        _face_comparator = FaceComparator()
+        with _face_comparator_lock:
+            if _face_comparator is None:
+                _face_comparator = FaceComparator()
     return _face_comparator
 
 
@@ -303,3 +551,32 @@ def compare_passport_to_id(
     """
     comparator = get_face_comparator()
     return comparator.compare_faces(passport_img, id_card_img, method=method)
+
+
+def compare_passport_to_id_bytes(
+    passport_bytes: bytes,
+    id_card_bytes: bytes,
+    method: str = 'ensemble'
+) -> Tuple[Optional[bool], Optional[float], Dict[str, float]]:
+    """
+    Compare passport photo to ID card photo given encoded image bytes.
+    
+    Decodes straight to BGR arrays with OpenCV, skipping the PIL round-trip.
+    
+    Args:
+        passport_bytes: Encoded passport/portrait photo (JPEG, PNG, ...)
+        id_card_bytes: Encoded ID card image
+        method: Comparison method ('histogram', 'ssim', 'features', 'ensemble')
+        
+    Returns:
+        Tuple of (match_boolean, overall_score, detailed_scores_dict)
+    """
+    cv2 = _load_cv2()
+    comparator = get_face_comparator()
+    passport_img = cv2.imdecode(np.frombuffer(passport_bytes, np.uint8), cv2.IMREAD_COLOR)
+    id_card_img = cv2.imdecode(np.frombuffer(id_card_bytes, np.uint8), cv2.IMREAD_COLOR)
+    
+    if passport_img is None or id_card_img is None:
+        return None, None, {'error': 'Could not decode image'}
+    
+    return comparator.compare_faces(passport_img, id_card_img, method=method)
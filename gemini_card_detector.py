@@ -3,18 +3,25 @@ Gemini API-based card type detection and text extraction.
 Identifies card types and extracts labeled text fields using Google's Generative AI.
 """
 
+import asyncio
+import copy
+import functools
+import hashlib
 import json
 import base64
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 from PIL import Image
 import io
+from cachetools import LRUCache
 
 # Phase 2 Integration
 from logger_config import audit_logger
-from retry_utils import retry_api_call
+from retry_utils import retry_api_call, async_retry_with_backoff, RetryConfig
 from rate_limiter import APIUsageTracker, QuotaEnforcer
-from exceptions import create_error, CardDetectionError, TextExtractionError
+from exceptions import create_error, APIError, CardDetectionError, TextExtractionError
 
 try:
     import google.generativeai as genai
@@ -22,6 +29,161 @@ try:
 except ImportError:
     _have_gemini = False
 
+try:
+    # HTTP 429 surfaces from the Gemini client as ResourceExhausted/TooManyRequests
+    from google.api_core import exceptions as google_exceptions
+    _RATE_LIMIT_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+except ImportError:
+    _RATE_LIMIT_ERRORS = ()
+
+try:
+    # orjson decodes the larger text-extraction responses several times faster
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    # Newer google-genai SDK, only needed for Batch Mode
+    from google import genai as google_genai
+    _have_batch_api = True
+except ImportError:
+    _have_batch_api = False
+
+try:
+    import cv2
+    import numpy as np
+    _have_cv2 = True
+except ImportError:
+    _have_cv2 = False
+
+# Image payload limits for Vision requests
+MAX_IMAGE_EDGE = 1024
+DETECT_IMAGE_EDGE = 512      # Card type needs layout and colors, not fine text
+JPEG_QUALITY = 85
+
+# Prompt for card type detection (shared by the realtime and batch paths)
+CARD_TYPE_PROMPT = """Analyze this identification card image and determine its type.
+
+Based on the card's appearance, text, colors, logos, and design patterns, identify the card type.
+
+The possible card types are:
+1. Ghana Card - Official national ID card of Ghana
+2. Voter ID Card - Voter registration/identification card
+3. Ghana Passport - Ghanaian passport book/document
+4. Ghana Driver's License - Ghana vehicle driver's license
+5. Other - Unknown or non-identification card
+
+Respond with only this JSON object and no other keys:
+{"t": "[one of the 5 type names above]", "c": [confidence 0.0 to 1.0]}"""
+
+# Multi-image card type detection; formatted with the number of images
+BATCH_CARD_TYPE_PROMPT_TEMPLATE = """You are given {count} identification card images, numbered 1 to {count} in the order they appear.
+
+For each image, determine its card type based on the card's appearance, text, colors, logos, and design patterns.
+
+The possible card types are:
+1. Ghana Card - Official national ID card of Ghana
+2. Voter ID Card - Voter registration/identification card
+3. Ghana Passport - Ghanaian passport book/document
+4. Ghana Driver's License - Ghana vehicle driver's license
+5. Other - Unknown or non-identification card
+
+Respond with a JSON array containing one object per image in this exact format:
+[
+    {{"index": [image number], "card_type": "[one of the 5 types above]", "confidence": [0.0 to 1.0]}},
+    ...
+]"""
+
+# Text extraction; formatted with a one-line card type hint
+TEXT_EXTRACTION_PROMPT_TEMPLATE = """{hint}. Extract all visible text and labeled fields from this card.
+
+Use the labels visible on the card (such as 'Name', 'Date of Birth', 'ID Number', 'Address', 'Sex', 'Nationality', 'Expiry Date', etc.) to identify the corresponding values.
+
+For each label found on the card, extract the associated text value. Be precise and only extract what is actually visible on the card.
+
+Respond with a JSON object in this exact format:
+{{
+    "text_fields": {{
+        "label_name": "extracted_value",
+        ...
+    }},
+    "raw_ocr": "all visible text on the card concatenated",
+    "fields_confidence": 0.0-1.0,
+    "notes": "any important observations"
+}}
+
+Example fields might include: name, surname, date_of_birth, id_number, address, sex, nationality, issuing_authority, expiry_date, registration_number, etc."""
+
+# Fused card type detection and text extraction
+CARD_ANALYSIS_PROMPT = """Analyze this identification card image. Identify the card type AND extract all visible text and labeled fields.
+
+Based on the card's appearance, text, colors, logos, and design patterns, identify the card type.
+
+The possible card types are:
+1. Ghana Card - Official national ID card of Ghana
+2. Voter ID Card - Voter registration/identification card
+3. Ghana Passport - Ghanaian passport book/document
+4. Ghana Driver's License - Ghana vehicle driver's license
+5. Other - Unknown or non-identification card
+
+Use the labels visible on the card (such as 'Name', 'Date of Birth', 'ID Number', 'Address', 'Sex', 'Nationality', 'Expiry Date', etc.) to identify the corresponding values.
+
+For each label found on the card, extract the associated text value. Be precise and only extract what is actually visible on the card.
+
+Respond with a JSON object in this exact format:
+{
+    "card_type": "[one of the 5 types above]",
+    "confidence": [0.0 to 1.0],
+    "text_fields": {
+        "label_name": "extracted_value",
+        ...
+    },
+    "raw_ocr": "all visible text on the card concatenated",
+    "fields_confidence": 0.0-1.0,
+    "notes": "any important observations"
+}
+
+Example fields might include: name, surname, date_of_birth, id_number, address, sex, nationality, issuing_authority, expiry_date, registration_number, etc."""
+
+CARD_TYPES = ('Ghana Card', 'Voter ID Card', 'Ghana Passport', 'Ghana Driver\'s License', 'Other')
+
+# Structured output: the model must return exactly {"t": <card type>, "c": <confidence>}
+CARD_TYPE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "t": {"type": "STRING", "format": "enum", "enum": list(CARD_TYPES)},
+        "c": {"type": "NUMBER"}
+    },
+    "required": ["t", "c"]
+}
+CARD_TYPE_CONFIG = {"response_mime_type": "application/json", "response_schema": CARD_TYPE_SCHEMA}
+
+# Free-form field maps cannot be schema-locked, but JSON mode still drops fences and prose
+JSON_RESPONSE_CONFIG = {"response_mime_type": "application/json"}
+
+# Use available model variants (gemini-1.5-flash is not available, use newer versions)
+MODEL_NAMES = (
+    'gemini-2.5-flash',      # Try the latest model first
+    'gemini-2.0-flash',      # Fallback to 2.0 flash
+    'gemini-2.5-pro',        # Fallback to pro version
+    'gemini-pro'             # Fallback to basic model
+)
+
+# First model in MODEL_NAMES that could be created; probed once per process
+_resolved_model_name: Optional[str] = None
+
+# Digest of the API key configure_gemini last succeeded with (never the key itself)
+_configured_key_hash: Optional[str] = None
+
+# Model used for Batch Mode jobs
+BATCH_MODEL_NAME = 'gemini-2.5-flash'
+
+# Responses keyed by (kind, image digest, ...): identical uploads skip the API
+RESPONSE_CACHE_SIZE = 512
+_response_cache = LRUCache(maxsize=RESPONSE_CACHE_SIZE)
+_response_cache_lock = Lock()
+
 # Initialize usage tracking
 usage_tracker = APIUsageTracker()
 quota_enforcer = QuotaEnforcer(usage_tracker)
@@ -30,29 +192,224 @@ quota_enforcer = QuotaEnforcer(usage_tracker)
 @retry_api_call
 def configure_gemini(api_key: str) -> bool:
     """Configure Gemini API with the provided API key. Returns True if successful."""
+    global _configured_key_hash
     if not _have_gemini:
         audit_logger.logger.error('Gemini library not available', extra={'event': 'gemini_config_failed', 'reason': 'library_missing'})
         return False
+    
+    # Already configured with this key: nothing to redo
+    key_hash = hashlib.blake2b(api_key.encode('utf-8'), digest_size=8).hexdigest()
+    if key_hash == _configured_key_hash:
+        return True
+    
     try:
         genai.configure(api_key=api_key)
-        audit_logger.logger.info('Gemini API configured successfully', extra={'event': 'gemini_configured'})
+        # Cached models hold a client bound to the previous configuration
+        _get_model.cache_clear()
+        
+        # Resolve the model here so requests never have to probe for one
+        model, model_name = _select_model()
+        if model is None:
+            audit_logger.logger.error('No suitable Gemini model available', extra={'event': 'no_model_available'})
+            return False
+        
+        _configured_key_hash = key_hash
+        audit_logger.logger.info('Gemini API configured successfully', extra={'event': 'gemini_configured', 'model': model_name})
         return True
     except Exception as e:
         audit_logger.logger.error(f'Error configuring Gemini: {str(e)}', extra={'event': 'gemini_config_error', 'error': str(e)})
         return False
 
 
-def pil_to_base64(pil_img: Image.Image) -> str:
-    """Convert PIL Image to base64 string for Gemini API."""
+@functools.lru_cache(maxsize=4)
+def _get_model(model_name: str):
+    """Return a shared GenerativeModel for model_name."""
+    return genai.GenerativeModel(model_name)
+
+
+def _select_model():
+    """Return (model, model_name) for the first available Gemini model, or (None, None)."""
+    global _resolved_model_name
+    if _resolved_model_name is not None:
+        return _get_model(_resolved_model_name), _resolved_model_name
+    
+    for model_name in MODEL_NAMES:
+        try:
+            model = _get_model(model_name)
+            audit_logger.logger.info(f'Using model: {model_name}', extra={'event': 'model_selected', 'model': model_name})
+            _resolved_model_name = model_name
+            return model, model_name
+        except Exception as e:
+            audit_logger.logger.debug(f'Model {model_name} not available: {e}')
+            continue
+    
+    return None, None
+
+
+def _normalize_card_type(card_type) -> str:
+    """Strip any description from a model-returned card type and map unknowns to 'Other'."""
+    # Handles responses like "Ghana Card" or "Ghana Card - Official national ID card of Ghana"
+    if ' - ' in str(card_type):
+        card_type = card_type.split(' - ')[0].strip()
+    
+    if card_type not in CARD_TYPES:
+        card_type = 'Other'
+    return card_type
+
+
+def _card_type_from_json(result: Dict[str, any]) -> Tuple[str, float]:
+    """Map a compact {"t", "c"} card type response to (card_type, confidence)."""
+    # Long keys are still accepted in case a model ignores the compact format
+    card_type = result.get('t', result.get('card_type', 'Other'))
+    confidence = result.get('c', result.get('confidence', 0.0))
+    return _normalize_card_type(card_type), float(confidence)
+
+
+def _record_usage(response, model_name: str, default_in: int, default_out: int) -> float:
+    """
+    Record a Gemini call with the token counts the API reported.
+    
+    Args:
+        response: generate_content response (may lack usage_metadata, e.g.
+            a stream that was abandoned before its final chunk)
+        model_name: Model that served the call
+        default_in: Estimated input tokens if the response has no counts
+        default_out: Estimated output tokens if the response has no counts
+    
+    Returns:
+        Cost of the call in USD
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    tokens_in = getattr(usage, 'prompt_token_count', 0) or default_in
+    tokens_out = getattr(usage, 'candidates_token_count', 0) or default_out
+    
+    cost = usage_tracker.record_api_call('default_user', model_name, tokens_in=tokens_in, tokens_out=tokens_out)
+    audit_logger.logger.debug('Gemini usage recorded', extra={
+        'event': 'gemini_usage',
+        'model': model_name,
+        'tokens_in': tokens_in,
+        'tokens_out': tokens_out,
+        'cost_usd': cost
+    })
+    return cost
+
+
+def _image_digest(img_base64: str) -> str:
+    """Return a short content hash of an encoded image for response caching."""
+    return hashlib.blake2b(img_base64.encode('ascii'), digest_size=16).hexdigest()
+
+
+def _cached_response(key: Tuple) -> Optional[any]:
+    """Return a copy of the cached response for key, or None on a miss."""
+    with _response_cache_lock:
+        value = _response_cache.get(key)
+    return copy.deepcopy(value) if value is not None else None
+
+
+def _store_response(key: Tuple, value: any) -> None:
+    """Cache a copy of a successful response under key."""
+    with _response_cache_lock:
+        _response_cache[key] = copy.deepcopy(value)
+
+
+def clear_response_cache() -> None:
+    """Drop all cached Gemini responses."""
+    with _response_cache_lock:
+        _response_cache.clear()
+
+
+def _json_object_complete(text: str) -> bool:
+    """Return True once text contains a complete top-level JSON object."""
+    start = text.find('{')
+    if start == -1:
+        return False
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for ch in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
+
+
+def _extract_json(response_text: str) -> Optional[Dict[str, any]]:
+    """Parse the outermost JSON object in a model response, or return None if there is none."""
+    # Outermost braces also skip any ```json fences around the object
+    json_start = response_text.find('{')
+    json_end = response_text.rfind('}') + 1
+    if json_start == -1 or json_end <= json_start:
+        return None
+    return _json_loads(response_text[json_start:json_end])
+
+
+def pil_to_base64(pil_img: Image.Image, max_edge: int = MAX_IMAGE_EDGE,
+                  quality: int = JPEG_QUALITY,
+                  bbox: Optional[Tuple[int, int, int, int]] = None) -> str:
+    """
+    Convert PIL Image to base64 JPEG string for Gemini API.
+    
+    Args:
+        pil_img: PIL Image object
+        max_edge: Longest side in pixels; larger images are downscaled to fit
+        quality: JPEG quality (1-95)
+        bbox: Optional (left, upper, right, lower) card region to crop to first
+    
+    Returns:
+        Base64-encoded JPEG, or empty string on failure
+    """
     if pil_img is None:
         return ""
     try:
-        buffered = io.BytesIO()
-        # Convert to RGB if necessary
+        # Background outside the card only costs tokens
+        if bbox is not None:
+            pil_img = pil_img.crop(bbox)
+        
+        # Convert to RGB if necessary. RGBA is left alone when cv2 is available:
+        # its BGR conversion below drops the alpha channel (card photos never
+        # need it) without a separate full-size PIL copy
+        if pil_img.mode != 'RGB' and not (_have_cv2 and pil_img.mode == 'RGBA'):
+            pil_img = pil_img.convert('RGB')
+        
+        # Gemini bills images by tile, so resolution beyond this adds cost, not accuracy
+        width, height = pil_img.size
+        if max(width, height) > max_edge:
+            scale = max_edge / max(width, height)
+            pil_img = pil_img.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.Resampling.LANCZOS
+            )
+        
+        if _have_cv2:
+            # libjpeg-turbo via OpenCV encodes several times faster than Pillow
+            code = cv2.COLOR_RGBA2BGR if pil_img.mode == 'RGBA' else cv2.COLOR_RGB2BGR
+            bgr = cv2.cvtColor(np.asarray(pil_img), code)
+            ok, buf = cv2.imencode('.jpg', bgr, [
+                int(cv2.IMWRITE_JPEG_QUALITY), quality,
+                int(cv2.IMWRITE_JPEG_OPTIMIZE), 1
+            ])
+            if ok:
+                return base64.b64encode(buf).decode('ascii')
+        
         if pil_img.mode != 'RGB':
             pil_img = pil_img.convert('RGB')
-        pil_img.save(buffered, format="JPEG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        buffered = io.BytesIO()
+        pil_img.save(buffered, format="JPEG", quality=quality, optimize=True, progressive=False)
+        # getbuffer() exposes the JPEG bytes without the copy getvalue() makes
+        img_base64 = base64.b64encode(buffered.getbuffer()).decode('ascii')
         return img_base64
     except Exception as e:
         print(f"Error converting image to base64: {e}")
@@ -60,13 +417,15 @@ def pil_to_base64(pil_img: Image.Image) -> str:
 
 
 @retry_api_call
-def detect_card_type(pil_img: Image.Image, api_key: str = None) -> Tuple[str, float]:
+def detect_card_type(pil_img: Union[Image.Image, str], api_key: str = None,
+                     bbox: Optional[Tuple[int, int, int, int]] = None) -> Tuple[str, float]:
     """
     Detect the type of identification card using Gemini Vision API.
     
     Args:
-        pil_img: PIL Image object of the ID card
+        pil_img: PIL Image object of the ID card, or its pil_to_base64 encoding
         api_key: Gemini API key (if not already configured)
+        bbox: Optional (left, upper, right, lower) card region within pil_img
     
     Returns:
         Tuple of (card_type, confidence) where card_type is one of:
@@ -88,94 +447,67 @@ def detect_card_type(pil_img: Image.Image, api_key: str = None) -> Tuple[str, fl
     
     try:
         # Convert image to base64
-        img_base64 = pil_to_base64(pil_img)
+        if isinstance(pil_img, str):
+            img_base64 = pil_img
+        else:
+            img_base64 = pil_to_base64(pil_img, max_edge=DETECT_IMAGE_EDGE, bbox=bbox)
         if not img_base64:
             audit_logger.logger.error('Failed to convert image to base64', extra={'event': 'card_type_image_convert_failed'})
             return 'Other', 0.0
         
+        # Same image as an earlier call: reuse its answer
+        cache_key = ('detect', _image_digest(img_base64))
+        cached = _cached_response(cache_key)
+        if cached is not None:
+            audit_logger.logger.info('Card type detected successfully', extra={
+                'event': 'card_type_detected',
+                'card_type': cached[0],
+                'confidence': cached[1],
+                'cache_hit': True
+            })
+            return cached
+        
         # Check quota before making API call
         allowed, quota_info = quota_enforcer.check_quota_before_call('default_user')
         if not allowed:
             audit_logger.logger.warning('API quota exceeded', extra={'event': 'quota_exceeded', 'quota_info': quota_info})
             raise create_error('API_LIMIT_EXCEEDED')
         
-        # Initialize Gemini model - use proper model name
-        model = None
-        # Use available model variants (gemini-1.5-flash is not available, use newer versions)
-        model_names = [
-            'gemini-2.5-flash',      # Try the latest model first
-            'gemini-2.0-flash',      # Fallback to 2.0 flash
-            'gemini-2.5-pro',        # Fallback to pro version
-            'gemini-pro'             # Fallback to basic model
-        ]
-        
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                audit_logger.logger.debug(f'Using model: {model_name}', extra={'event': 'model_selected', 'model': model_name})
-                break
-            except Exception as e:
-                audit_logger.logger.debug(f'Model {model_name} not available: {e}')
-                continue
-        
+        # Initialize Gemini model
+        model, model_name = _select_model()
         if model is None:
             audit_logger.logger.error('No suitable Gemini model available', extra={'event': 'no_model_available'})
             return 'Other', 0.0
         
-        # Create prompt for card type detection
-        prompt = """Analyze this identification card image and determine its type.
-
-Based on the card's appearance, text, colors, logos, and design patterns, identify the card type.
-
-The possible card types are:
-1. Ghana Card - Official national ID card of Ghana
-2. Voter ID Card - Voter registration/identification card
-3. Ghana Passport - Ghanaian passport book/document
-4. Ghana Driver's License - Ghana vehicle driver's license
-5. Other - Unknown or non-identification card
-
-Respond with a JSON object in this exact format:
-{
-    "card_type": "[one of the 5 types above]",
-    "confidence": [0.0 to 1.0],
-    "reasoning": "[brief explanation of what you observed]"
-}"""
-        
-        # Call Gemini API with vision capabilities
+        # Call Gemini API with vision capabilities, streaming so we can stop
+        # reading as soon as the JSON object is complete
         response = model.generate_content([
-            prompt,
+            CARD_TYPE_PROMPT,
             {
                 "mime_type": "image/jpeg",
                 "data": img_base64
             }
-        ])
+        ], generation_config=CARD_TYPE_CONFIG, stream=True)
         
         # Parse response
-        response_text = response.text
+        response_text = ''
+        for chunk in response:
+            if not chunk.parts:
+                # e.g. a trailing chunk carrying only the finish reason
+                continue
+            response_text += chunk.text
+            if _json_object_complete(response_text):
+                break
         
         # Extract JSON from response
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
+        result = _extract_json(response_text)
         
-        if json_start != -1 and json_end > json_start:
-            json_str = response_text[json_start:json_end]
-            result = json.loads(json_str)
-            card_type = result.get('card_type', 'Other')
-            confidence = float(result.get('confidence', 0.0))
-            
-            # Clean up card_type - extract just the type name without description
-            # Handles responses like "Ghana Card" or "Ghana Card - Official national ID card of Ghana"
-            if ' - ' in str(card_type):
-                card_type = card_type.split(' - ')[0].strip()
-            
-            # Validate card type
-            valid_types = ['Ghana Card', 'Voter ID Card', 'Ghana Passport', 
-                          'Ghana Driver\'s License', 'Other']
-            if card_type not in valid_types:
-                card_type = 'Other'
+        if result is not None:
+            # Clean up and validate card_type
+            card_type, confidence = _card_type_from_json(result)
             
             # Record API usage after successful call with actual model used
-            usage_tracker.record_api_call('default_user', model_name, tokens_in=1500, tokens_out=100)
+            _record_usage(response, model_name, default_in=1500, default_out=100)
             
             audit_logger.logger.info('Card type detected successfully', extra={
                 'event': 'card_type_detected',
@@ -183,6 +515,7 @@ Respond with a JSON object in this exact format:
                 'confidence': confidence
             })
             
+            _store_response(cache_key, (card_type, confidence))
             return card_type, confidence
         else:
             audit_logger.logger.warning('Failed to parse Gemini response for card type', extra={'event': 'card_type_parse_failed'})
@@ -194,15 +527,244 @@ Respond with a JSON object in this exact format:
 
 
 @retry_api_call
-def extract_card_text(pil_img: Image.Image, card_type: str = None, 
-                      api_key: str = None) -> Dict[str, any]:
+def detect_card_types_batch(images: List[Image.Image], api_key: str = None,
+                            batch_size: int = 10) -> List[Tuple[str, float]]:
+    """
+    Detect the card type of many images, packing several into each Gemini request.
+    
+    Args:
+        images: PIL Image objects of the ID cards
+        api_key: Gemini API key (if not already configured)
+        batch_size: Maximum number of images sent in one request
+    
+    Returns:
+        List of (card_type, confidence) tuples in the same order as images;
+        entries that could not be classified are ('Other', 0.0)
+    """
+    results = [('Other', 0.0)] * len(images)
+    if not _have_gemini or not images:
+        audit_logger.logger.warning('Batch card type detection unavailable', extra={
+            'event': 'card_type_batch_unavailable',
+            'has_gemini': _have_gemini,
+            'image_count': len(images) if images else 0
+        })
+        return results
+    
+    if api_key:
+        if not configure_gemini(api_key):
+            audit_logger.logger.error('Failed to configure Gemini in detect_card_types_batch', extra={'event': 'card_type_batch_config_failed'})
+            return results
+    
+    model, model_name = _select_model()
+    if model is None:
+        audit_logger.logger.error('No suitable Gemini model available', extra={'event': 'no_model_available'})
+        return results
+    
+    for start in range(0, len(images), batch_size):
+        # Encode this chunk, remembering which input slot each image fills
+        indices = []
+        contents = []
+        for i in range(start, min(start + batch_size, len(images))):
+            img_base64 = pil_to_base64(images[i])
+            if img_base64:
+                indices.append(i)
+                contents.append({"mime_type": "image/jpeg", "data": img_base64})
+        if not indices:
+            continue
+        
+        try:
+            # Check quota before making API call
+            allowed, quota_info = quota_enforcer.check_quota_before_call('default_user')
+            if not allowed:
+                audit_logger.logger.warning('API quota exceeded', extra={'event': 'quota_exceeded', 'quota_info': quota_info})
+                raise create_error('API_LIMIT_EXCEEDED')
+            
+            prompt = BATCH_CARD_TYPE_PROMPT_TEMPLATE.format(count=len(indices))
+            
+            response = model.generate_content([prompt] + contents, generation_config=JSON_RESPONSE_CONFIG)
+            response_text = response.text
+            
+            # Extract JSON array from response
+            json_start = response_text.find('[')
+            json_end = response_text.rfind(']') + 1
+            if json_start == -1 or json_end <= json_start:
+                audit_logger.logger.warning('Failed to parse Gemini response for batch card type', extra={'event': 'card_type_batch_parse_failed'})
+                continue
+            
+            for entry in json.loads(response_text[json_start:json_end]):
+                position = int(entry.get('index', 0)) - 1
+                if 0 <= position < len(indices):
+                    results[indices[position]] = (
+                        _normalize_card_type(entry.get('card_type', 'Other')),
+                        float(entry.get('confidence', 0.0))
+                    )
+            
+            _record_usage(response, model_name,
+                          default_in=1500 * len(indices), default_out=100 * len(indices))
+            
+            audit_logger.logger.info('Batch card type detection successful', extra={
+                'event': 'card_type_batch_detected',
+                'image_count': len(indices)
+            })
+        
+        except Exception as e:
+            audit_logger.logger.error(f'Error detecting card types in batch: {str(e)}', extra={'event': 'card_type_batch_error', 'error': str(e)})
+    
+    return results
+
+
+def submit_cards_batch(images: List[Image.Image], api_key: str) -> Optional[str]:
+    """
+    Submit card type detection for many images as a Gemini Batch Mode job.
+    
+    Batch jobs are billed at a discount and do not count against the realtime
+    rate limit, but complete asynchronously (within 24 hours). Use for
+    offline reprocessing; collect results with poll_batch.
+    
+    Args:
+        images: PIL Image objects of the ID cards
+        api_key: Gemini API key
+    
+    Returns:
+        Batch job name, or None if the job could not be submitted
+    """
+    if not _have_batch_api or not images:
+        audit_logger.logger.warning('Gemini batch submission unavailable', extra={
+            'event': 'card_batch_unavailable',
+            'has_batch_api': _have_batch_api,
+            'image_count': len(images) if images else 0
+        })
+        return None
+    
+    try:
+        # Check quota before submitting the job
+        allowed, quota_info = quota_enforcer.check_quota_before_call('default_user')
+        if not allowed:
+            audit_logger.logger.warning('API quota exceeded', extra={'event': 'quota_exceeded', 'quota_info': quota_info})
+            raise create_error('API_LIMIT_EXCEEDED')
+        
+        # One JSONL request per image, keyed by its position in images
+        lines = []
+        for i, pil_img in enumerate(images):
+            img_base64 = pil_to_base64(pil_img)
+            if not img_base64:
+                continue
+            lines.append(json.dumps({
+                "key": str(i),
+                "request": {
+                    "contents": [{
+                        "role": "user",
+                        "parts": [
+                            {"text": CARD_TYPE_PROMPT},
+                            {"inline_data": {"mime_type": "image/jpeg", "data": img_base64}}
+                        ]
+                    }],
+                    "generation_config": CARD_TYPE_CONFIG
+                }
+            }))
+        
+        client = google_genai.Client(api_key=api_key)
+        src_file = client.files.upload(
+            file=io.BytesIO('\n'.join(lines).encode('utf-8')),
+            config={'display_name': 'card-type-batch', 'mime_type': 'jsonl'}
+        )
+        job = client.batches.create(
+            model=BATCH_MODEL_NAME,
+            src=src_file.name,
+            config={'display_name': 'card-type-batch'}
+        )
+        
+        audit_logger.logger.info('Gemini batch job submitted', extra={
+            'event': 'card_batch_submitted',
+            'job_name': job.name,
+            'image_count': len(lines)
+        })
+        return job.name
+    
+    except Exception as e:
+        audit_logger.logger.error(f'Error submitting Gemini batch job: {str(e)}', extra={'event': 'card_batch_submit_error', 'error': str(e)})
+        return None
+
+
+def poll_batch(job_name: str, api_key: str) -> Optional[Dict[int, Tuple[str, float]]]:
+    """
+    Fetch the results of a batch job created by submit_cards_batch.
+    
+    Args:
+        job_name: Name returned by submit_cards_batch
+        api_key: Gemini API key
+    
+    Returns:
+        None while the job is still running; otherwise a dict mapping each
+        image's index to its (card_type, confidence). A failed, cancelled or
+        expired job returns an empty dict.
+    """
+    if not _have_batch_api:
+        audit_logger.logger.warning('Gemini batch polling unavailable', extra={'event': 'card_batch_unavailable'})
+        return {}
+    
+    client = google_genai.Client(api_key=api_key)
+    job = client.batches.get(name=job_name)
+    state = job.state.name
+    
+    if state not in ('JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'):
+        return None
+    
+    if state != 'JOB_STATE_SUCCEEDED':
+        audit_logger.logger.error('Gemini batch job did not succeed', extra={
+            'event': 'card_batch_failed',
+            'job_name': job_name,
+            'state': state
+        })
+        return {}
+    
+    results = {}
+    tokens_in = tokens_out = 0
+    output = client.files.download(file=job.dest.file_name).decode('utf-8')
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        index = int(entry['key'])
+        usage = entry.get('response', {}).get('usageMetadata', {})
+        tokens_in += usage.get('promptTokenCount', 1500)
+        tokens_out += usage.get('candidatesTokenCount', 100)
+        try:
+            response_text = entry['response']['candidates'][0]['content']['parts'][0]['text']
+            result = _extract_json(response_text)
+        except (KeyError, IndexError, ValueError):
+            result = None
+        
+        if result is None:
+            results[index] = ('Other', 0.0)
+        else:
+            results[index] = _card_type_from_json(result)
+    
+    # Recorded at realtime rates, so quota accounting stays conservative
+    if results:
+        usage_tracker.record_api_call('default_user', BATCH_MODEL_NAME,
+                                      tokens_in=tokens_in, tokens_out=tokens_out)
+    
+    audit_logger.logger.info('Gemini batch job results collected', extra={
+        'event': 'card_batch_collected',
+        'job_name': job_name,
+        'result_count': len(results)
+    })
+    return results
+
+
+@retry_api_call
+def extract_card_text(pil_img: Union[Image.Image, str], card_type: str = None, 
+                      api_key: str = None,
+                      bbox: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, any]:
     """
     Extract labeled text fields from an identification card using Gemini Vision API.
     
     Args:
-        pil_img: PIL Image object of the ID card
+        pil_img: PIL Image object of the ID card, or its pil_to_base64 encoding
         card_type: Type of card (for targeted field extraction)
         api_key: Gemini API key (if not already configured)
+        bbox: Optional (left, upper, right, lower) card region within pil_img
     
     Returns:
         Dictionary with extracted fields and metadata in format:
@@ -244,7 +806,10 @@ def extract_card_text(pil_img: Image.Image, card_type: str = None,
     
     try:
         # Convert image to base64
-        img_base64 = pil_to_base64(pil_img)
+        if isinstance(pil_img, str):
+            img_base64 = pil_img
+        else:
+            img_base64 = pil_to_base64(pil_img, bbox=bbox)
         if not img_base64:
             audit_logger.logger.error('Failed to convert image to base64 in extract_card_text', extra={'event': 'text_extraction_image_convert_failed'})
             return {
@@ -255,31 +820,26 @@ def extract_card_text(pil_img: Image.Image, card_type: str = None,
                 "message": "Failed to convert image"
             }
         
+        # Same image and hint as an earlier call: reuse its answer
+        cache_key = ('extract', _image_digest(img_base64), card_type)
+        cached = _cached_response(cache_key)
+        if cached is not None:
+            audit_logger.logger.info('Text extraction successful', extra={
+                'event': 'text_extraction_success',
+                'fields_count': len(cached['text_fields']),
+                'confidence': cached['confidence'],
+                'cache_hit': True
+            })
+            return cached
+        
         # Check quota before making API call
         allowed, quota_info = quota_enforcer.check_quota_before_call('default_user')
         if not allowed:
             audit_logger.logger.warning('API quota exceeded during text extraction', extra={'event': 'text_extraction_quota_exceeded', 'quota_info': quota_info})
             raise create_error('API_LIMIT_EXCEEDED')
         
-        # Initialize Gemini model - use proper model name
-        model = None
-        # Use available model variants (gemini-1.5-flash is not available, use newer versions)
-        model_names = [
-            'gemini-2.5-flash',      # Try the latest model first
-            'gemini-2.0-flash',      # Fallback to 2.0 flash
-            'gemini-2.5-pro',        # Fallback to pro version
-            'gemini-pro'             # Fallback to basic model
-        ]
-        
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                audit_logger.logger.debug(f'Using model: {model_name}', extra={'event': 'model_selected', 'model': model_name})
-                break
-            except Exception as e:
-                audit_logger.logger.debug(f'Model {model_name} not available: {e}')
-                continue
-        
+        # Initialize Gemini model
+        model, model_name = _select_model()
         if model is None:
             audit_logger.logger.error('No suitable Gemini model available', extra={'event': 'no_model_available'})
             return {
@@ -292,25 +852,7 @@ def extract_card_text(pil_img: Image.Image, card_type: str = None,
         
         # Create prompt for text extraction
         card_type_hint = f"This is a {card_type}" if card_type else "This is an identification card"
-        
-        prompt = f"""{card_type_hint}. Extract all visible text and labeled fields from this card.
-
-Use the labels visible on the card (such as 'Name', 'Date of Birth', 'ID Number', 'Address', 'Sex', 'Nationality', 'Expiry Date', etc.) to identify the corresponding values.
-
-For each label found on the card, extract the associated text value. Be precise and only extract what is actually visible on the card.
-
-Respond with a JSON object in this exact format:
-{{
-    "text_fields": {{
-        "label_name": "extracted_value",
-        ...
-    }},
-    "raw_ocr": "all visible text on the card concatenated",
-    "fields_confidence": 0.0-1.0,
-    "notes": "any important observations"
-}}
-
-Example fields might include: name, surname, date_of_birth, id_number, address, sex, nationality, issuing_authority, expiry_date, registration_number, etc."""
+        prompt = TEXT_EXTRACTION_PROMPT_TEMPLATE.format(hint=card_type_hint)
         
         # Call Gemini API with vision capabilities
         response = model.generate_content([
@@ -319,21 +861,17 @@ Example fields might include: name, surname, date_of_birth, id_number, address,
                 "mime_type": "image/jpeg",
                 "data": img_base64
             }
-        ])
+        ], generation_config=JSON_RESPONSE_CONFIG)
         
         # Parse response
         response_text = response.text
         
         # Extract JSON from response
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
+        result = _extract_json(response_text)
         
-        if json_start != -1 and json_end > json_start:
-            json_str = response_text[json_start:json_end]
-            result = json.loads(json_str)
-            
+        if result is not None:
             # Record API usage after successful call with actual model used
-            usage_tracker.record_api_call('default_user', model_name, tokens_in=1500, tokens_out=500)
+            _record_usage(response, model_name, default_in=1500, default_out=500)
             
             audit_logger.logger.info('Text extraction successful', extra={
                 'event': 'text_extraction_success',
@@ -341,7 +879,7 @@ Example fields might include: name, surname, date_of_birth, id_number, address,
                 'confidence': float(result.get('fields_confidence', 0.0))
             })
             
-            return {
+            text_result = {
                 "text_fields": result.get('text_fields', {}),
                 "raw_ocr": result.get('raw_ocr', ''),
                 "confidence": float(result.get('fields_confidence', 0.0)),
@@ -349,6 +887,8 @@ Example fields might include: name, surname, date_of_birth, id_number, address,
                 "message": "Text extraction successful",
                 "notes": result.get('notes', '')
             }
+            _store_response(cache_key, text_result)
+            return text_result
         else:
             audit_logger.logger.warning('Failed to parse Gemini response for text extraction', extra={'event': 'text_extraction_parse_failed'})
             return {
@@ -370,14 +910,137 @@ Example fields might include: name, surname, date_of_birth, id_number, address,
         }
 
 
+def _analyze_once(img_base64: str) -> Optional[Dict[str, any]]:
+    """
+    Detect card type and extract text fields with a single Gemini Vision call.
+    
+    Args:
+        img_base64: pil_to_base64 encoding of the ID card (MAX_IMAGE_EDGE)
+    
+    Returns:
+        Dictionary with card_type, card_type_confidence and text_extraction
+        (same shape as extract_card_text), or None if the call could not be
+        made or its response could not be parsed
+    """
+    if not img_base64:
+        audit_logger.logger.error('Failed to convert image to base64 in card analysis', extra={'event': 'card_analysis_image_convert_failed'})
+        return None
+    
+    # Same image as an earlier call: reuse its answer
+    cache_key = ('analyze', _image_digest(img_base64))
+    cached = _cached_response(cache_key)
+    if cached is not None:
+        audit_logger.logger.debug('Card analysis served from cache', extra={'event': 'card_analysis_cache_hit', 'cache_hit': True})
+        return cached
+    
+    # Check quota before making API call
+    allowed, quota_info = quota_enforcer.check_quota_before_call('default_user')
+    if not allowed:
+        audit_logger.logger.warning('API quota exceeded during card analysis', extra={'event': 'card_analysis_quota_exceeded', 'quota_info': quota_info})
+        raise create_error('API_LIMIT_EXCEEDED')
+    
+    # Initialize Gemini model
+    model, model_name = _select_model()
+    if model is None:
+        audit_logger.logger.error('No suitable Gemini model available', extra={'event': 'no_model_available'})
+        return None
+    
+    # Call Gemini API with vision capabilities
+    response = model.generate_content([
+        CARD_ANALYSIS_PROMPT,
+        {
+            "mime_type": "image/jpeg",
+            "data": img_base64
+        }
+    ], generation_config=JSON_RESPONSE_CONFIG)
+    
+    # Parse response
+    response_text = response.text
+    
+    # Extract JSON from response
+    result = _extract_json(response_text)
+    if result is None:
+        audit_logger.logger.warning('Failed to parse Gemini response for card analysis', extra={'event': 'card_analysis_parse_failed'})
+        return None
+    
+    # One call covers both the detection and extraction budgets
+    _record_usage(response, model_name, default_in=1500, default_out=600)
+    
+    analysis = {
+        "card_type": _normalize_card_type(result.get('card_type', 'Other')),
+        "card_type_confidence": float(result.get('confidence', 0.0)),
+        "text_extraction": {
+            "text_fields": result.get('text_fields', {}),
+            "raw_ocr": result.get('raw_ocr', ''),
+            "confidence": float(result.get('fields_confidence', 0.0)),
+            "success": True,
+            "message": "Text extraction successful",
+            "notes": result.get('notes', '')
+        }
+    }
+    _store_response(cache_key, analysis)
+    return analysis
+
+
+def _analyze_split(pil_img: Image.Image, img_base64: str,
+                   bbox: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, any]:
+    """
+    Run detect_card_type and extract_card_text concurrently on the same image.
+    
+    Extraction starts speculatively without a card type hint so the two
+    requests overlap; its result is discarded if the image is confidently
+    not an identification card.
+    
+    Args:
+        pil_img: PIL Image object of the ID card
+        img_base64: Its MAX_IMAGE_EDGE encoding, already made for _analyze_once
+        bbox: Optional (left, upper, right, lower) card region within pil_img
+    
+    Returns:
+        Dictionary with card_type, card_type_confidence and text_extraction
+    """
+    # Extraction reuses the full-size payload; detection only needs the
+    # smaller DETECT_IMAGE_EDGE one, encoded once here
+    detect_base64 = pil_to_base64(pil_img, max_edge=DETECT_IMAGE_EDGE, bbox=bbox)
+    
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        type_future = executor.submit(detect_card_type, detect_base64)
+        text_future = executor.submit(extract_card_text, img_base64)
+        
+        card_type, card_confidence = type_future.result()
+        if card_type == 'Other' and card_confidence >= 0.8:
+            # The request may already be in flight; we just stop waiting for it
+            text_future.cancel()
+            text_result = {
+                "text_fields": {},
+                "raw_ocr": "",
+                "confidence": 0.0,
+                "success": False,
+                "message": "Image is not a recognized identification card"
+            }
+        else:
+            text_result = text_future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return {
+        "card_type": card_type,
+        "card_type_confidence": card_confidence,
+        "text_extraction": text_result
+    }
+
+
 @retry_api_call
-def analyze_card_complete(pil_img: Image.Image, api_key: str) -> Dict[str, any]:
+def analyze_card_complete(pil_img: Image.Image, api_key: str,
+                          bbox: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, any]:
     """
     Complete card analysis: detect type and extract text in one call.
     
     Args:
         pil_img: PIL Image object of the ID card
         api_key: Gemini API key
+        bbox: Optional (left, upper, right, lower) card region within pil_img
     
     Returns:
         Complete analysis result with card type, text fields, and metadata
@@ -418,39 +1081,122 @@ def analyze_card_complete(pil_img: Image.Image, api_key: str) -> Dict[str, any]:
         }
     
     try:
-        # Step 1: Detect card type
-        card_type, card_confidence = detect_card_type(pil_img, api_key=api_key)
+        # Detect type and extract text in one request (the image is uploaded once)
+        img_base64 = pil_to_base64(pil_img, bbox=bbox)
+        analysis = _analyze_once(img_base64)
+        if analysis is None:
+            # Fused response unusable: fall back to the single-purpose prompts
+            analysis = _analyze_split(pil_img, img_base64, bbox=bbox)
         
-        # Step 2: Extract text with card type hint
-        text_result = extract_card_text(pil_img, card_type=card_type, api_key=api_key)
-        
-        audit_logger.logger.info('Complete card analysis successful', extra={
-            'event': 'card_analysis_success',
-            'card_type': card_type,
-            'card_confidence': card_confidence,
-            'text_success': text_result.get('success')
-        })
-        
-        return {
-            "card_type": card_type,
-            "card_type_confidence": card_confidence,
-            "text_extraction": text_result,
-            "success": text_result.get('success', False),
-            "message": text_result.get('message', '')
-        }
+        return _complete_result(analysis)
         
     except Exception as e:
-        audit_logger.logger.error(f'Error in complete card analysis: {str(e)}', extra={'event': 'card_analysis_error', 'error': str(e)})
-        return {
-            "card_type": "Other",
-            "card_type_confidence": 0.0,
-            "text_extraction": {
-                "text_fields": {},
-                "raw_ocr": "",
-                "confidence": 0.0,
-                "success": False
-            },
-            "success": False,
-            "message": f"Error: {str(e)}"
-        }
+        return _complete_error(e)
+
+
+def _complete_result(analysis: Dict[str, any]) -> Dict[str, any]:
+    """Build the analyze_card_complete response from an analysis dict."""
+    card_type = analysis['card_type']
+    card_confidence = analysis['card_type_confidence']
+    text_result = analysis['text_extraction']
+    
+    audit_logger.logger.info('Complete card analysis successful', extra={
+        'event': 'card_analysis_success',
+        'card_type': card_type,
+        'card_confidence': card_confidence,
+        'text_success': text_result.get('success')
+    })
+    
+    return {
+        "card_type": card_type,
+        "card_type_confidence": card_confidence,
+        "text_extraction": text_result,
+        "success": text_result.get('success', False),
+        "message": text_result.get('message', '')
+    }
+
+
+def _complete_error(e: Exception) -> Dict[str, any]:
+    """Build the analyze_card_complete response for an unexpected error."""
+    audit_logger.logger.error(f'Error in complete card analysis: {str(e)}', extra={'event': 'card_analysis_error', 'error': str(e)})
+    return {
+        "card_type": "Other",
+        "card_type_confidence": 0.0,
+        "text_extraction": {
+            "text_fields": {},
+            "raw_ocr": "",
+            "confidence": 0.0,
+            "success": False
+        },
+        "success": False,
+        "message": f"Error: {str(e)}"
+    }
+
+
+@async_retry_with_backoff(
+    max_retries=RetryConfig.API_MAX_RETRIES,
+    initial_delay=RetryConfig.API_INITIAL_DELAY,
+    backoff_factor=RetryConfig.API_BACKOFF_FACTOR,
+    max_delay=RetryConfig.API_MAX_DELAY,
+    exceptions=(TimeoutError, APIError, ConnectionError) + _RATE_LIMIT_ERRORS
+)
+async def _analyze_once_async(img_base64: str) -> Optional[Dict[str, any]]:
+    """Run _analyze_once in a worker thread, backing off without blocking the event loop."""
+    return await asyncio.to_thread(_analyze_once, img_base64)
+
+
+async def detect_card_type_async(pil_img: Image.Image, api_key: str = None) -> Tuple[str, float]:
+    """Async variant of detect_card_type; runs the blocking call in a worker thread."""
+    return await asyncio.to_thread(detect_card_type, pil_img, api_key)
+
+
+async def analyze_card_complete_async(pil_img: Image.Image, api_key: str,
+                                      bbox: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, any]:
+    """
+    Async variant of analyze_card_complete.
+    
+    Rate-limit (429) and transient errors are retried with jittered backoff
+    on the event loop, honoring the server's requested delay, so waiting
+    callers do not hold worker threads.
+    """
+    if not _have_gemini or pil_img is None or not configure_gemini(api_key):
+        # Produces the standard unavailable / configuration failure response
+        return await asyncio.to_thread(analyze_card_complete, pil_img, api_key, bbox)
+    
+    try:
+        img_base64 = await asyncio.to_thread(pil_to_base64, pil_img, MAX_IMAGE_EDGE, JPEG_QUALITY, bbox)
+        analysis = await _analyze_once_async(img_base64)
+        if analysis is None:
+            analysis = await asyncio.to_thread(_analyze_split, pil_img, img_base64, bbox)
+        return _complete_result(analysis)
+    
+    except Exception as e:
+        return _complete_error(e)
+
+
+async def analyze_cards_async(images: List[Image.Image], api_key: str,
+                              concurrency: int = 8) -> List[Dict[str, any]]:
+    """
+    Analyze many cards with up to `concurrency` Gemini requests in flight.
+    
+    Args:
+        images: PIL Image objects of the ID cards
+        api_key: Gemini API key
+        concurrency: Maximum number of simultaneous requests
+    
+    Returns:
+        analyze_card_complete results in the same order as images
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def analyze(pil_img):
+        async with semaphore:
+            return await analyze_card_complete_async(pil_img, api_key)
+    
+    return await asyncio.gather(*(analyze(img) for img in images))
+
 
+def analyze_cards_concurrent(images: List[Image.Image], api_key: str,
+                             concurrency: int = 8) -> List[Dict[str, any]]:
+    """Synchronous wrapper around analyze_cards_async for callers without an event loop."""
+    return asyncio.run(analyze_cards_async(images, api_key, concurrency))
@@ -10,6 +10,63 @@ import numpy as np
 from PIL import Image, ImageDraw
 import io
 import os
+import threading
+from functools import cached_property
+
+# Detection runs on a copy no larger than this (pixels, longest side)
+DETECTION_MAX_DIMENSION = 640
+
+FRONTAL_CASCADE_FILE = 'haarcascade_frontalface_default.xml'
+
+# res10 SSD face detector files, kept next to this module. The 8-bit
+# TensorFlow weights are fetched by the setup step (download_dnn_models);
+# the Caffe model is committed and used when they are absent or unreadable.
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+TF_MODEL_FILE = 'opencv_face_detector_uint8.pb'
+TF_CONFIG_FILE = 'opencv_face_detector.pbtxt'
+TF_MODEL_URL = "https://raw.githubusercontent.com/opencv/opencv_3rdparty/dnn_samples_face_detector_20180220_uint8/opencv_face_detector_uint8.pb"
+TF_CONFIG_URL = "https://raw.githubusercontent.com/opencv/opencv_extra/master/testdata/dnn/opencv_face_detector.pbtxt"
+
+
+def _available_cpus():
+    """
+    CPUs this process may actually use: the cgroup CPU quota (cgroup v2
+    cpu.max or v1 cfs_quota_us/cfs_period_us) capped by the scheduler
+    affinity mask. os.cpu_count() reports host cores inside containers.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    
+    quota = period = None
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            pass
+    
+    try:
+        if quota not in (None, 'max', '-1'):
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except ValueError:
+        pass
+    return cpus
+
+
+def _cuda_device_count():
+    """Number of CUDA devices OpenCV can use (0 for builds without CUDA)."""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount()
+    except (AttributeError, cv2.error):
+        return 0
+
 
 class IDCardFaceDetector:
     """
@@ -17,114 +74,170 @@ class IDCardFaceDetector:
     Handles low quality, rotation, and various lighting conditions.
     """
     
-    def __init__(self):
-        """Initialize face detection models."""
-        # Load OpenCV DNN face detector (more robust)
-        model_dir = os.path.dirname(__file__)
-        self.dnn_net = None
-        
-        # Try to load DNN model
-        try:
-            proto_path = os.path.join(model_dir, 'deploy.prototxt')
-            model_path = os.path.join(model_dir, 'res10_300x300_ssd_iter_140000.caffemodel')
-            
-            # Download models if not present
-            if not os.path.exists(proto_path) or not os.path.exists(model_path):
-                self._download_dnn_models(model_dir)
-            
-            self.dnn_net = cv2.dnn.readNetFromCaffe(proto_path, model_path)
-            print("✓ DNN face detector loaded")
-        except Exception as e:
-            print(f"⚠ DNN model not available: {e}")
-        
-        # Load Haar Cascade as fallback
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+    def __init__(self, denoise_strength=3, device=None):
+        """
+        Initialize face detection models.
         
-        # Load profile cascade for rotated faces
-        self.profile_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_profileface.xml'
-        )
+        Args:
+            denoise_strength: Median filter aperture used when enhancing images
+                for the Haar cascades (odd, >= 3); 0 disables denoising
+            device: 'cuda' to run the DNN forward pass and frontal Haar scan
+                on the GPU when OpenCV was built with CUDA, 'cpu' otherwise.
+                Defaults to the FACE_DETECTOR_DEVICE environment variable (cpu).
+        
+        OpenCV's thread pool (process-wide) is sized to the OPENCV_THREADS
+        environment variable, or else to the container's CPU quota.
+        """
+        self.denoise_strength = denoise_strength
+        
+        # OpenCV sizes its pool from the host core count, which oversubscribes
+        # CPU-limited containers
+        cv2.setNumThreads(int(os.getenv('OPENCV_THREADS', _available_cpus())))
+        
+        if device is None:
+            device = os.getenv('FACE_DETECTOR_DEVICE', 'cpu')
+        self.use_cuda = device.lower() == 'cuda' and _cuda_device_count() > 0
+        if device.lower() == 'cuda' and not self.use_cuda:
+            print("⚠ No CUDA device available to OpenCV, using CPU")
+        
+        # The detector is shared across requests; cv2.dnn.Net and the CUDA
+        # cascade are not thread-safe, and each thread gets its own CPU
+        # cascades (see _thread_cascade)
+        self._dnn_lock = threading.Lock()
+        self._gpu_lock = threading.Lock()
+        self._local = threading.local()
+        
+        # Frontal Haar cascade is the cheap first stage, so load it up front;
+        # the DNN and profile cascade load on first use
+        self.face_cascade
+        self.face_cascade_gpu = None
+        if self.use_cuda:
+            try:
+                self.face_cascade_gpu = cv2.cuda.CascadeClassifier_create(
+                    cv2.data.haarcascades + FRONTAL_CASCADE_FILE
+                )
+            except cv2.error as e:
+                print(f"⚠ CUDA Haar cascade not available: {e}")
         
         print("✓ ID Card Face Detector initialized")
     
-    def _download_dnn_models(self, model_dir):
-        """Download DNN face detection models."""
-        import urllib.request
-        
-        print("Downloading DNN face detection models...")
-        
-        proto_url = "https://raw.githubusercontent.com/opencv/opencv/master/samples/dnn/face_detector/deploy.prototxt"
-        model_url = "https://raw.githubusercontent.com/opencv/opencv_3rdparty/dnn_samples_face_detector_20170830/res10_300x300_ssd_iter_140000.caffemodel"
-        
-        proto_path = os.path.join(model_dir, 'deploy.prototxt')
-        model_path = os.path.join(model_dir, 'res10_300x300_ssd_iter_140000.caffemodel')
+    @cached_property
+    def dnn_net(self):
+        """OpenCV DNN face detector (more robust), or None if unavailable."""
+        # Prefer the 8-bit TensorFlow weights installed by download_dnn_models;
+        # never fetch on the detection path. Both models take the same input.
+        net = None
+        model_path = os.path.join(MODEL_DIR, TF_MODEL_FILE)
+        config_path = os.path.join(MODEL_DIR, TF_CONFIG_FILE)
+        if os.path.exists(model_path) and os.path.exists(config_path):
+            try:
+                net = cv2.dnn.readNetFromTensorflow(model_path, config_path)
+            except cv2.error as e:
+                print(f"⚠ 8-bit DNN model unreadable, using Caffe model: {e}")
         
         try:
-            urllib.request.urlretrieve(proto_url, proto_path)
-            urllib.request.urlretrieve(model_url, model_path)
-            print("✓ DNN models downloaded successfully")
+            if net is None:
+                net = cv2.dnn.readNetFromCaffe(
+                    os.path.join(MODEL_DIR, 'deploy.prototxt'),
+                    os.path.join(MODEL_DIR, 'res10_300x300_ssd_iter_140000.caffemodel')
+                )
+            if self.use_cuda:
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+            print("✓ DNN face detector loaded")
+            return net
         except Exception as e:
-            print(f"⚠ Failed to download DNN models: {e}")
+            print(f"⚠ DNN model not available: {e}")
+            return None
     
-    def preprocess_image(self, img):
+    def _thread_cascade(self, name, filename):
+        """
+        Return this thread's copy of a CPU Haar cascade, loading it on first use.
+        
+        CascadeClassifier.detectMultiScale is not safe to call concurrently
+        on one instance, so threads sharing the detector each get their own.
+        """
+        cascade = getattr(self._local, name, None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + filename)
+            setattr(self._local, name, cascade)
+        return cascade
+    
+    @property
+    def face_cascade(self):
+        """Frontal face Haar cascade for the calling thread."""
+        return self._thread_cascade('face_cascade', FRONTAL_CASCADE_FILE)
+    
+    @property
+    def profile_cascade(self):
+        """Profile cascade for rotated faces, for the calling thread."""
+        return self._thread_cascade('profile_cascade', 'haarcascade_profileface.xml')
+    
+    def preprocess_image(self, img, need_enhanced=False):
         """
         Preprocess image for better face detection.
-        - Enhance contrast
-        - Reduce noise
         - Auto-rotate if needed
+        - Enhance contrast and reduce noise (only for the Haar cascades;
+          the DNN normalizes its own input)
         
         Args:
             img: OpenCV image (BGR)
+            need_enhanced: Apply CLAHE and denoising to the grayscale image
         
         Returns:
-            preprocessed: Enhanced image
+            preprocessed: Rotated image (BGR)
+            gray: Grayscale of the rotated image, enhanced if requested
             rotation_angle: Detected rotation angle
         """
-        # Convert to grayscale for analysis
+        # Convert to grayscale once; rotation and the cascades share it
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        # Enhance contrast using CLAHE
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
-        
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(enhanced)
-        
         # Detect rotation
-        rotation_angle = self._detect_rotation(img)
+        rotation_angle = self._detect_rotation(gray)
         
         # Rotate if needed
         if abs(rotation_angle) > 5:  # Only rotate if angle > 5 degrees
             img = self._rotate_image(img, rotation_angle)
+            gray = self._rotate_image(gray, rotation_angle)
             print(f"✓ Auto-rotated image by {rotation_angle:.1f}°")
         
-        return img, rotation_angle
-    
-    def _detect_rotation(self, img):
-        """Detect image rotation angle using text detection."""
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if need_enhanced:
+            gray = self._enhance_gray(gray)
         
-        # Use edge detection to find text orientation
-        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-        
-        # Detect lines using Hough transform
-        lines = cv2.HoughLines(edges, 1, np.pi / 180, 100)
+        return img, gray, rotation_angle
+    
+    def _enhance_gray(self, gray):
+        """Boost contrast (CLAHE) and denoise a grayscale image for the Haar cascades."""
+        # Enhance contrast using CLAHE
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        gray = clahe.apply(gray)
         
-        if lines is None:
+        # Denoise: a small median filter is plenty for the cascades and
+        # far cheaper than non-local means
+        if self.denoise_strength:
+            gray = cv2.medianBlur(gray, self.denoise_strength)
+        return gray
+    
+    def _detect_rotation(self, gray):
+        """Detect image rotation angle from the minimum-area box around the dark (text) pixels."""
+        # The angle does not depend on scale, so estimate it on a small copy
+        h, w = gray.shape[:2]
+        if max(h, w) > DETECTION_MAX_DIMENSION:
+            scale = DETECTION_MAX_DIMENSION / max(h, w)
+            gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        
+        # Text and print are darker than the card background
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+        coords = cv2.findNonZero(thresh)
+        
+        # Too little ink to estimate an orientation (blank card)
+        if coords is None or len(coords) < 500:
             return 0
         
-        # Calculate average angle
-        angles = []
-        for rho, theta in lines[:, 0]:
-            angle = np.degrees(theta) - 90
-            if -45 < angle < 45:  # Only consider reasonable rotations
-                angles.append(angle)
-        
-        if angles:
-            return np.median(angles)
-        return 0
+        # minAreaRect reports an edge angle in (0, 90] or [-90, 0) depending on
+        # the OpenCV version; fold it into [-45, 45)
+        angle = cv2.minAreaRect(coords)[-1]
+        return ((angle + 45) % 90) - 45
     
     def _rotate_image(self, img, angle):
         """Rotate image by given angle."""
@@ -157,100 +270,159 @@ class IDCardFaceDetector:
         if isinstance(img, Image.Image):
             img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
         
-        # Preprocess image
-        preprocessed, rotation = self.preprocess_image(img.copy())
+        # Detect on a bounded-size copy: faces fill a large part of an ID card,
+        # and cascade/rotation cost grows with pixel count
+        h, w = img.shape[:2]
+        scale = 1.0
+        small = img
+        if max(h, w) > DETECTION_MAX_DIMENSION:
+            scale = DETECTION_MAX_DIMENSION / max(h, w)
+            small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        # Preprocess image (enhancement happens later, only if the cheap
+        # stages fail)
+        preprocessed, gray, rotation = self.preprocess_image(small)
+        
+        faces, method = self._detect_cascade(preprocessed, gray, min_confidence)
+        
+        if scale != 1.0:
+            # Map boxes back to full resolution and return the full-size image
+            faces = [tuple(int(round(v / scale)) for v in face) for face in faces]
+            preprocessed = self._rotate_image(img, rotation) if abs(rotation) > 5 else img
+        
+        return faces, method, preprocessed
+    
+    def _detect_cascade(self, img, gray, min_confidence=0.5):
+        """
+        Run the detectors cheapest-first until one finds a face.
         
+        Args:
+            img: Preprocessed OpenCV image (BGR)
+            gray: Grayscale of img
+            min_confidence: Minimum confidence for DNN detection
+        
+        Returns:
+            faces: List of (x, y, w, h) face bounding boxes in img coordinates
+            method: Detection method used
+        """
         faces = []
         method = "none"
         
-        # Method 1: DNN detector (most robust)
+        # Method 1: Haar Cascade, restricted to portrait-sized faces so that
+        # small patterns on the card do not count as a hit
+        faces = self._detect_haar(gray, min_size=(80, 80))
+        if len(faces) > 0:
+            method = "Haar Cascade"
+            print(f"✓ Detected {len(faces)} face(s) using Haar Cascade")
+            return faces, method
+        
+        # Method 2: DNN detector (most robust, but the most expensive)
         if self.dnn_net is not None:
-            faces, conf = self._detect_dnn(preprocessed, min_confidence)
+            faces, conf = self._detect_dnn(img, min_confidence)
             if len(faces) > 0:
                 method = f"DNN (conf: {conf:.2f})"
                 print(f"✓ Detected {len(faces)} face(s) using DNN")
-                return faces, method, preprocessed
+                return faces, method
         
-        # Method 2: Haar Cascade on enhanced image
-        faces = self._detect_haar(preprocessed)
-        if len(faces) > 0:
-            method = "Haar Cascade"
-            print(f"✓ Detected {len(faces)} face(s) using Haar Cascade")
-            return faces, method, preprocessed
+        # Remaining methods are for hard images: enhance contrast and denoise
+        gray = self._enhance_gray(gray)
         
-        # Method 3: Try different scales
+        # Method 3: Try different scales on enhanced image
         for scale in [1.1, 1.05, 1.15]:
-            faces = self._detect_haar(preprocessed, scale_factor=scale)
+            faces = self._detect_haar(gray, scale_factor=scale)
             if len(faces) > 0:
                 method = f"Haar (scale: {scale})"
                 print(f"✓ Detected {len(faces)} face(s) using Haar at scale {scale}")
-                return faces, method, preprocessed
+                return faces, method
         
         # Method 4: Profile detection (for rotated faces)
-        faces = self._detect_profile(preprocessed)
+        faces = self._detect_profile(gray)
         if len(faces) > 0:
             method = "Profile Cascade"
             print(f"✓ Detected {len(faces)} face(s) using Profile detection")
-            return faces, method, preprocessed
+            return faces, method
         
         print("⚠ No faces detected with any method")
-        return [], method, preprocessed
+        return [], method
     
     def _detect_dnn(self, img, min_confidence=0.5):
         """Detect faces using DNN."""
         h, w = img.shape[:2]
         
-        # Prepare blob
+        # Prepare blob; blobFromImage resizes and subtracts the mean in one pass
         blob = cv2.dnn.blobFromImage(
-            cv2.resize(img, (300, 300)), 1.0,
-            (300, 300), (104.0, 177.0, 123.0)
+            img, 1.0, (300, 300), (104.0, 177.0, 123.0),
+            swapRB=False, crop=False
         )
         
-        self.dnn_net.setInput(blob)
-        detections = self.dnn_net.forward()
+        with self._dnn_lock:
+            self.dnn_net.setInput(blob)
+            detections = self.dnn_net.forward()
         
-        faces = []
-        max_conf = 0
+        # Each detection row is [image_id, label, confidence, x1, y1, x2, y2];
+        # filter and scale them all at once rather than row by row
+        detections = detections[0, 0]
+        detections = detections[detections[:, 2] > min_confidence]
+        if len(detections) == 0:
+            return [], 0
         
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            
-            if confidence > min_confidence:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (x, y, x2, y2) = box.astype("int")
-                
-                # Convert to (x, y, w, h)
-                faces.append((x, y, x2 - x, y2 - y))
-                max_conf = max(max_conf, confidence)
-        
-        return faces, max_conf
-    
-    def _detect_haar(self, img, scale_factor=1.1):
-        """Detect faces using Haar Cascade."""
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        boxes = (detections[:, 3:7] * np.array([w, h, w, h])).astype("int")
+        
+        # Convert to (x, y, w, h)
+        boxes[:, 2:] -= boxes[:, :2]
+        
+        return [tuple(box) for box in boxes.tolist()], float(detections[:, 2].max())
+    
+    def _detect_haar(self, gray, scale_factor=1.1, min_size=(30, 30)):
+        """Detect faces using Haar Cascade on a grayscale image."""
+        if self.face_cascade_gpu is not None:
+            return self._detect_haar_gpu(gray, scale_factor, min_size)
         
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=scale_factor,
             minNeighbors=5,
-            minSize=(30, 30),
+            minSize=min_size,
             flags=cv2.CASCADE_SCALE_IMAGE
         )
         
         return list(faces)
     
-    def _detect_profile(self, img):
-        """Detect profile faces."""
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    def _detect_haar_gpu(self, gray, scale_factor, min_size):
+        """Run the frontal Haar cascade on the GPU."""
+        with self._gpu_lock:
+            gpu_gray = cv2.cuda_GpuMat()
+            gpu_gray.upload(gray)
+            
+            cascade = self.face_cascade_gpu
+            cascade.setScaleFactor(scale_factor)
+            cascade.setMinNeighbors(5)
+            cascade.setMinObjectSize(min_size)
+            faces = cascade.convert(cascade.detectMultiScale(gpu_gray))
         
-        faces = self.profile_cascade.detectMultiScale(
+        return list(faces) if faces is not None else []
+    
+    def _detect_profile(self, gray):
+        """Detect left- and right-facing profile faces on a grayscale image."""
+        faces = list(self.profile_cascade.detectMultiScale(
             gray,
             scaleFactor=1.1,
             minNeighbors=5,
             minSize=(30, 30)
+        ))
+        
+        # The cascade only finds one facing direction; scan the mirror image
+        # for the other and map the boxes back
+        width = gray.shape[1]
+        mirrored = self.profile_cascade.detectMultiScale(
+            cv2.flip(gray, 1),
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(30, 30)
         )
+        faces.extend((width - x - w, y, w, h) for (x, y, w, h) in mirrored)
         
-        return list(faces)
+        return faces
     
     def highlight_face(self, img, faces, color=(0, 255, 0), thickness=2):
         """
@@ -286,43 +458,37 @@ class IDCardFaceDetector:
         """Draw dotted rectangle."""
         dash_length = 10
         gap_length = 5
-        
-        # Top line
-        for i in range(x, x + w, dash_length + gap_length):
-            draw.line([(i, y), (min(i + dash_length, x + w), y)], 
-                     fill=color, width=thickness)
-        
-        # Bottom line
-        for i in range(x, x + w, dash_length + gap_length):
-            draw.line([(i, y + h), (min(i + dash_length, x + w), y + h)], 
-                     fill=color, width=thickness)
-        
-        # Left line
-        for i in range(y, y + h, dash_length + gap_length):
-            draw.line([(x, i), (x, min(i + dash_length, y + h))], 
-                     fill=color, width=thickness)
-        
-        # Right line
-        for i in range(y, y + h, dash_length + gap_length):
-            draw.line([(x + w, i), (x + w, min(i + dash_length, y + h))], 
-                     fill=color, width=thickness)
+        step = dash_length + gap_length
+        
+        # Dash start/end offsets along the horizontal and vertical edges
+        xs = np.arange(x, x + w, step)
+        xe = np.minimum(xs + dash_length, x + w)
+        ys = np.arange(y, y + h, step)
+        ye = np.minimum(ys + dash_length, y + h)
+        
+        # All dashes as (x1, y1, x2, y2) rows: top, bottom, left, right
+        segments = np.concatenate([
+            np.column_stack([xs, np.full_like(xs, y), xe, np.full_like(xs, y)]),
+            np.column_stack([xs, np.full_like(xs, y + h), xe, np.full_like(xs, y + h)]),
+            np.column_stack([np.full_like(ys, x), ys, np.full_like(ys, x), ye]),
+            np.column_stack([np.full_like(ys, x + w), ys, np.full_like(ys, x + w), ye]),
+        ])
+        
+        for x1, y1, x2, y2 in segments.tolist():
+            draw.line([(x1, y1), (x2, y2)], fill=color, width=thickness)
     
     def extract_face(self, img, face_box, padding=0.2):
         """
         Extract face region with padding.
         
         Args:
-            img: OpenCV image or PIL Image
+            img: OpenCV image (BGR)
             face_box: (x, y, w, h) tuple
             padding: Percentage padding around face
         
         Returns:
             face_img: Extracted face as PIL Image
         """
-        # Convert to OpenCV if needed
-        if isinstance(img, Image.Image):
-            img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-        
         x, y, w, h = face_box
         
         # Add padding
@@ -334,13 +500,11 @@ class IDCardFaceDetector:
         x2 = min(img.shape[1], x + w + pad_w)
         y2 = min(img.shape[0], y + h + pad_h)
         
-        # Extract face region
-        face_img = img[y1:y2, x1:x2]
-        
-        # Convert to PIL
-        face_pil = Image.fromarray(cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB))
+        # Crop first (a view), so the only colour conversion covers just the
+        # face; cvtColor writes it to a new contiguous RGB buffer
+        face_rgb = cv2.cvtColor(img[y1:y2, x1:x2], cv2.COLOR_BGR2RGB)
         
-        return face_pil
+        return Image.fromarray(face_rgb)
     
     def convert_to_passport_size(self, face_img, size=(600, 600)):
         """
@@ -353,8 +517,14 @@ class IDCardFaceDetector:
         Returns:
             passport_img: Resized image
         """
-        # Resize maintaining aspect ratio
-        face_img.thumbnail(size, Image.Resampling.LANCZOS)
+        # Shrink to fit, maintaining aspect ratio; unlike thumbnail() this
+        # leaves the caller's image untouched
+        scale = min(size[0] / face_img.width, size[1] / face_img.height)
+        if scale < 1:
+            face_img = face_img.resize(
+                (max(1, round(face_img.width * scale)), max(1, round(face_img.height * scale))),
+                Image.Resampling.LANCZOS
+            )
         
         # Create white background
         passport_img = Image.new('RGB', size, (255, 255, 255))
@@ -367,19 +537,22 @@ class IDCardFaceDetector:
         
         return passport_img
     
-    def process_id_card(self, id_card_img, save_path=None):
+    def process_id_card(self, id_card_img, save_path=None, passport_size=False):
         """
         Complete pipeline: detect, highlight, extract, and convert face from ID card.
         
         Args:
             id_card_img: PIL Image or path to image
-            save_path: Optional path to save extracted face
+            save_path: Optional path to save the first face, passport-sized
+            passport_size: Also build passport-sized copies of every face
         
         Returns:
             result: Dictionary with:
                 - faces_detected: Number of faces
                 - highlighted_img: Image with boxes
-                - extracted_faces: List of passport-sized face images
+                - extracted_faces: List of face crops (padded, not resized)
+                - passport_faces: List of passport-sized face images
+                  (empty unless passport_size is set)
                 - method: Detection method used
                 - success: Boolean
         """
@@ -398,6 +571,7 @@ class IDCardFaceDetector:
                 'faces_detected': 0,
                 'highlighted_img': id_card_img,
                 'extracted_faces': [],
+                'passport_faces': [],
                 'method': method,
                 'success': False,
                 'message': 'No faces detected on ID card'
@@ -406,26 +580,25 @@ class IDCardFaceDetector:
         # Highlight faces
         highlighted = self.highlight_face(id_card_img, faces)
         
-        # Extract and convert faces
-        extracted_faces = []
-        for i, face_box in enumerate(faces):
-            # Extract face
-            face_img = self.extract_face(cv_img, face_box)
-            
-            # Convert to passport size
-            passport_img = self.convert_to_passport_size(face_img)
-            
-            extracted_faces.append(passport_img)
-            
-            # Save if path provided
-            if save_path and i == 0:  # Save first (largest) face
-                passport_img.save(save_path)
-                print(f"✓ Saved extracted face to {save_path}")
+        # Extract faces; comparison works on the raw crops, so the white
+        # passport canvas is only built when it will be saved or asked for
+        extracted_faces = [self.extract_face(cv_img, face_box) for face_box in faces]
+        
+        passport_faces = []
+        if passport_size:
+            passport_faces = [self.convert_to_passport_size(f) for f in extracted_faces]
+        
+        # Save if path provided
+        if save_path:  # Save first (largest) face
+            passport_img = passport_faces[0] if passport_faces else self.convert_to_passport_size(extracted_faces[0])
+            passport_img.save(save_path)
+            print(f"✓ Saved extracted face to {save_path}")
         
         return {
             'faces_detected': len(faces),
             'highlighted_img': highlighted,
             'extracted_faces': extracted_faces,
+            'passport_faces': passport_faces,
             'face_boxes': faces,
             'method': method,
             'success': True,
@@ -433,6 +606,50 @@ class IDCardFaceDetector:
         }
 
 
+def download_dnn_models(model_dir=MODEL_DIR):
+    """
+    Download the 8-bit TensorFlow face SSD into model_dir (setup step).
+    
+    Each file is written under a temporary name and renamed once complete,
+    so an interrupted download never leaves a partial model for dnn_net to
+    load. On failure the detector keeps using the committed Caffe model.
+    
+    Args:
+        model_dir: Directory to save the model files in
+    
+    Returns:
+        True if both files were downloaded
+    """
+    import urllib.request
+    
+    print("Downloading DNN face detection models...")
+    
+    try:
+        for url, filename in ((TF_MODEL_URL, TF_MODEL_FILE), (TF_CONFIG_URL, TF_CONFIG_FILE)):
+            path = os.path.join(model_dir, filename)
+            urllib.request.urlretrieve(url, path + '.part')
+            os.replace(path + '.part', path)
+        print("✓ DNN models downloaded successfully")
+        return True
+    except Exception as e:
+        print(f"⚠ Failed to download DNN models, the Caffe model will be used: {e}")
+        return False
+
+
+# Global instance
+_id_face_detector = None
+_id_face_detector_lock = threading.Lock()
+
+def get_id_face_detector() -> IDCardFaceDetector:
+    """Get or create global ID card face detector instance."""
+    global _id_face_detector
+    if _id_face_detector is None:
+        with _id_face_detector_lock:
+            if _id_face_detector is None:
+                _id_face_detector = IDCardFaceDetector()
+    return _id_face_detector
+
+
 def compare_faces_advanced(passport_img, extracted_face_img, threshold=0.6):
     """
     Compare passport photo with extracted ID face using multiple methods.
@@ -445,9 +662,9 @@ def compare_faces_advanced(passport_img, extracted_face_img, threshold=0.6):
     Returns:
         result: Dictionary with match status and scores
     """
-    from face_comparison import FaceComparator
+    from face_comparison import get_face_comparator
     
-    comparator = FaceComparator()
+    comparator = get_face_comparator()
     
     # Use ensemble comparison method
     is_match, similarity, scores = comparator.compare_faces(
@@ -483,7 +700,7 @@ def detect_and_extract_id_face(id_card_path, output_path='extracted_face.jpg'):
     Returns:
         result: Detection result dictionary
     """
-    detector = IDCardFaceDetector()
+    detector = get_id_face_detector()
     result = detector.process_id_card(id_card_path, save_path=output_path)
     
     print(f"\n{'='*60}")
@@ -498,6 +715,11 @@ def detect_and_extract_id_face(id_card_path, output_path='extracted_face.jpg'):
 
 
 if __name__ == "__main__":
+    import sys
+    
+    if '--download-models' in sys.argv:
+        sys.exit(0 if download_dnn_models() else 1)
+    
     # Test the detector
     print("Testing ID Card Face Detector...")
     
@@ -3,9 +3,10 @@ ID Field Mappings - Defines structure and requirements for each ID type.
 Maps user input fields, OCR extraction fields, and validation rules.
 """
 
-from typing import Dict, List, Set, Optional, Tuple
+import re
+from typing import Callable, Dict, FrozenSet, List, Set, Optional, Tuple
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 # ============================================================================
 # FIELD CATEGORIES
@@ -20,6 +21,20 @@ class FieldCategory(Enum):
     SECURITY = "security"      # Sensitive field (CVV, PIN, etc.)
 
 
+# Patterns common enough to get a plain string check instead of the regex
+_ISO_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}$'
+_SEX_PATTERN = r'^[MFO]$|^(Male|Female|Other)$'
+_SEX_SET = frozenset({'M', 'F', 'O', 'Male', 'Female', 'Other'})
+
+
+def _is_iso_date(value: str) -> bool:
+    """Same check as _ISO_DATE_PATTERN (YYYY-MM-DD) without the regex engine."""
+    return (
+        len(value) == 10 and value[4] == '-' and value[7] == '-'
+        and value[:4].isdecimal() and value[5:7].isdecimal() and value[8:].isdecimal()
+    )
+
+
 @dataclass
 class IDField:
     """Definition of a single ID field."""
@@ -30,6 +45,20 @@ class IDField:
     min_length: Optional[int] = None
     max_length: Optional[int] = None
     sensitive: bool = False            # Should not be logged
+    _compiled: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+    _matches: Optional[Callable[[str], object]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Patterns are fixed per field, so compile once at definition time
+        self._compiled = re.compile(self.regex_pattern) if self.regex_pattern else None
+        
+        # Date and sex fields are checked without the regex engine
+        if self.regex_pattern == _ISO_DATE_PATTERN:
+            self._matches = _is_iso_date
+        elif self.regex_pattern == _SEX_PATTERN:
+            self._matches = _SEX_SET.__contains__
+        elif self._compiled is not None:
+            self._matches = self._compiled.match
     
     def validate(self, value: str) -> Tuple[bool, str]:
         """Validate field value. Returns (is_valid, error_message)."""
@@ -42,9 +71,8 @@ class IDField:
         if value and self.max_length and len(value) > self.max_length:
             return False, f"{self.display_name} must not exceed {self.max_length} characters"
         
-        if value and self.regex_pattern:
-            import re
-            if not re.match(self.regex_pattern, value):
+        if value and self._matches is not None:
+            if not self._matches(value):
                 return False, f"{self.display_name} format is invalid"
         
         return True, ""
@@ -74,27 +102,27 @@ GHANA_CARD_FIELDS = {
         name='date_of_birth',
         display_name='Date of Birth',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^\d{4}-\d{2}-\d{2}$',  # YYYY-MM-DD
+        regex_pattern=_ISO_DATE_PATTERN,  # YYYY-MM-DD
     ),
     'sex': IDField(
         name='sex',
         display_name='Sex',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^[MFO]$|^(Male|Female|Other)$',
+        regex_pattern=_SEX_PATTERN,
     ),
 }
 
-GHANA_CARD_USER_INPUT_FIELDS = [
+GHANA_CARD_USER_INPUT_FIELDS = (
     'full_name', 'ghana_pin', 'date_of_birth', 'sex'
-]
+)
 
-GHANA_CARD_OCR_FIELDS = [
+GHANA_CARD_OCR_FIELDS = (
     'full_name', 'ghana_pin', 'date_of_birth', 'sex'
-]
+)
 
-GHANA_CARD_REQUIRED_MATCH = [
+GHANA_CARD_REQUIRED_MATCH = (
     'ghana_pin', 'full_name', 'date_of_birth', 'sex'
-]
+)
 
 
 # ============================================================================
@@ -120,33 +148,33 @@ PASSPORT_FIELDS = {
         name='date_of_birth',
         display_name='Date of Birth',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^\d{4}-\d{2}-\d{2}$',
+        regex_pattern=_ISO_DATE_PATTERN,
     ),
     'sex': IDField(
         name='sex',
         display_name='Sex',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^[MFO]$|^(Male|Female|Other)$',
+        regex_pattern=_SEX_PATTERN,
     ),
     'expiry_date': IDField(
         name='expiry_date',
         display_name='Expiry Date',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^\d{4}-\d{2}-\d{2}$',
+        regex_pattern=_ISO_DATE_PATTERN,
     ),
 }
 
-PASSPORT_USER_INPUT_FIELDS = [
+PASSPORT_USER_INPUT_FIELDS = (
     'full_name', 'passport_number', 'date_of_birth', 'sex', 'expiry_date'
-]
+)
 
-PASSPORT_OCR_FIELDS = [
+PASSPORT_OCR_FIELDS = (
     'full_name', 'passport_number', 'date_of_birth', 'sex', 'expiry_date'
-]
+)
 
-PASSPORT_REQUIRED_MATCH = [
+PASSPORT_REQUIRED_MATCH = (
     'passport_number', 'full_name', 'date_of_birth', 'sex'
-]
+)
 
 
 # ============================================================================
@@ -170,27 +198,27 @@ VOTER_ID_FIELDS = {
         name='date_of_birth',
         display_name='Date of Birth',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^\d{4}-\d{2}-\d{2}$',
+        regex_pattern=_ISO_DATE_PATTERN,
     ),
     'sex': IDField(
         name='sex',
         display_name='Sex',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^[MFO]$|^(Male|Female|Other)$',
+        regex_pattern=_SEX_PATTERN,
     ),
 }
 
-VOTER_ID_USER_INPUT_FIELDS = [
+VOTER_ID_USER_INPUT_FIELDS = (
     'full_name', 'voter_id_number', 'date_of_birth', 'sex'
-]
+)
 
-VOTER_ID_OCR_FIELDS = [
+VOTER_ID_OCR_FIELDS = (
     'full_name', 'voter_id_number', 'date_of_birth', 'sex'
-]
+)
 
-VOTER_ID_REQUIRED_MATCH = [
+VOTER_ID_REQUIRED_MATCH = (
     'voter_id_number', 'full_name', 'date_of_birth', 'sex'
-]
+)
 
 
 # ============================================================================
@@ -214,27 +242,27 @@ DRIVERS_LICENSE_FIELDS = {
         name='date_of_birth',
         display_name='Date of Birth',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^\d{4}-\d{2}-\d{2}$',
+        regex_pattern=_ISO_DATE_PATTERN,
     ),
     'expiry_date': IDField(
         name='expiry_date',
         display_name='Expiry Date',
         category=FieldCategory.REQUIRED,
-        regex_pattern=r'^\d{4}-\d{2}-\d{2}$',
+        regex_pattern=_ISO_DATE_PATTERN,
     ),
 }
 
-DRIVERS_LICENSE_USER_INPUT_FIELDS = [
+DRIVERS_LICENSE_USER_INPUT_FIELDS = (
     'full_name', 'licence_number', 'date_of_birth', 'expiry_date'
-]
+)
 
-DRIVERS_LICENSE_OCR_FIELDS = [
+DRIVERS_LICENSE_OCR_FIELDS = (
     'full_name', 'licence_number', 'date_of_birth', 'expiry_date'
-]
+)
 
-DRIVERS_LICENSE_REQUIRED_MATCH = [
+DRIVERS_LICENSE_REQUIRED_MATCH = (
     'licence_number', 'full_name', 'date_of_birth'
-]
+)
 
 
 # ============================================================================
@@ -263,17 +291,17 @@ BANK_CARD_FIELDS = {
     ),
 }
 
-BANK_CARD_USER_INPUT_FIELDS = [
+BANK_CARD_USER_INPUT_FIELDS = (
     'cardholder_name', 'card_number', 'expiry_date'
-]
+)
 
-BANK_CARD_OCR_FIELDS = [
+BANK_CARD_OCR_FIELDS = (
     'cardholder_name', 'card_number', 'expiry_date'
-]
+)
 
-BANK_CARD_REQUIRED_MATCH = [
+BANK_CARD_REQUIRED_MATCH = (
     'cardholder_name', 'card_number', 'expiry_date'
-]
+)
 
 
 # ============================================================================
@@ -318,62 +346,108 @@ ID_TYPE_REGISTRY = {
     },
 }
 
+# Flat views of the registry for validation loops: one lookup per field
+FIELD_INDEX: Dict[Tuple[str, str], IDField] = {
+    (id_type, name): field_def
+    for id_type, spec in ID_TYPE_REGISTRY.items()
+    for name, field_def in spec['fields'].items()
+}
+
+REQUIRED_MATCH_INDEX: FrozenSet[Tuple[str, str]] = frozenset(
+    (id_type, name)
+    for id_type, spec in ID_TYPE_REGISTRY.items()
+    for name in spec['required_match']
+)
+
+
+def _build_plans() -> Dict[str, Tuple[Tuple[str, Callable[[str], Tuple[bool, str]]], ...]]:
+    """Per ID type, the (field_name, bound validate) pairs validate_id_form runs."""
+    plans = {}
+    for id_type, spec in ID_TYPE_REGISTRY.items():
+        plans[id_type] = tuple(
+            (name, FIELD_INDEX[id_type, name].validate)
+            for name in spec['user_input_fields']
+            if (id_type, name) in FIELD_INDEX
+        )
+    return plans
+
+
+_VALIDATION_PLANS = _build_plans()
+
+
+def _make_validator(
+    plan: Tuple[Tuple[str, Callable[[str], Tuple[bool, str]]], ...]
+) -> Callable[[Dict[str, str]], Tuple[bool, Dict[str, str]]]:
+    """Build a form validator closure over one validation plan."""
+    def _validate(form_data: Dict[str, str]) -> Tuple[bool, Dict[str, str]]:
+        get = form_data.get
+        errors = {}
+        for field_name, validate in plan:
+            ok, msg = validate(get(field_name, ''))
+            if not ok:
+                errors[field_name] = msg
+        return not errors, errors
+    
+    return _validate
+
+
+_FORM_VALIDATORS = {
+    id_type: _make_validator(plan) for id_type, plan in _VALIDATION_PLANS.items()
+}
+
 
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
+def _registry_entry(id_type: str) -> Dict:
+    """Look up an ID type's registry entry once, raising for unknown types."""
+    entry = ID_TYPE_REGISTRY.get(id_type)
+    if entry is None:
+        raise ValueError(f"Unknown ID type: {id_type}")
+    return entry
+
+
 def get_id_type_fields(id_type: str) -> Dict[str, IDField]:
     """Get all field definitions for an ID type."""
-    if id_type not in ID_TYPE_REGISTRY:
-        raise ValueError(f"Unknown ID type: {id_type}")
-    return ID_TYPE_REGISTRY[id_type]['fields']
+    return _registry_entry(id_type)['fields']
 
 
-def get_user_input_fields(id_type: str) -> List[str]:
+def get_user_input_fields(id_type: str) -> Tuple[str, ...]:
     """Get fields to display in user input form for an ID type."""
-    if id_type not in ID_TYPE_REGISTRY:
-        raise ValueError(f"Unknown ID type: {id_type}")
-    return ID_TYPE_REGISTRY[id_type]['user_input_fields']
+    return _registry_entry(id_type)['user_input_fields']
 
 
-def get_ocr_fields(id_type: str) -> List[str]:
+def get_ocr_fields(id_type: str) -> Tuple[str, ...]:
     """Get fields to extract from OCR for an ID type."""
-    if id_type not in ID_TYPE_REGISTRY:
-        raise ValueError(f"Unknown ID type: {id_type}")
-    return ID_TYPE_REGISTRY[id_type]['ocr_fields']
+    return _registry_entry(id_type)['ocr_fields']
 
 
-def get_required_match_fields(id_type: str) -> List[str]:
+def get_required_match_fields(id_type: str) -> Tuple[str, ...]:
     """Get fields that must match between user input and OCR."""
-    if id_type not in ID_TYPE_REGISTRY:
-        raise ValueError(f"Unknown ID type: {id_type}")
-    return ID_TYPE_REGISTRY[id_type]['required_match']
+    return _registry_entry(id_type)['required_match']
+
+
+def is_required_match_field(id_type: str, field_name: str) -> bool:
+    """Whether a field must match between user input and OCR for an ID type."""
+    return (id_type, field_name) in REQUIRED_MATCH_INDEX
 
 
 def validate_id_field(id_type: str, field_name: str, value: str) -> Tuple[bool, str]:
     """Validate a single field for an ID type."""
-    fields = get_id_type_fields(id_type)
-    if field_name not in fields:
+    field_def = FIELD_INDEX.get((id_type, field_name))
+    if field_def is None:
+        _registry_entry(id_type)  # Unknown ID types raise
         return False, f"Unknown field: {field_name}"
-    return fields[field_name].validate(value)
+    return field_def.validate(value)
 
 
 def validate_id_form(id_type: str, form_data: Dict[str, str]) -> Tuple[bool, Dict[str, str]]:
     """Validate all fields in a form. Returns (is_valid, errors_dict)."""
-    errors = {}
-    fields = get_id_type_fields(id_type)
-    user_input_fields = get_user_input_fields(id_type)
-    
-    for field_name in user_input_fields:
-        if field_name in fields:
-            field_def = fields[field_name]
-            value = form_data.get(field_name, '')
-            is_valid, error_msg = field_def.validate(value)
-            if not is_valid:
-                errors[field_name] = error_msg
-    
-    return len(errors) == 0, errors
+    validator = _FORM_VALIDATORS.get(id_type)
+    if validator is None:
+        raise ValueError(f"Unknown ID type: {id_type}")
+    return validator(form_data)
 
 
 if __name__ == '__main__':
@@ -3,21 +3,52 @@ Centralized logging configuration for the ID Verification system.
 Handles structured logging with file and console output.
 """
 
+import atexit
+import copy
 import logging
 import logging.handlers
 import json
-from datetime import datetime
+import queue
+import time
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+try:
+    # orjson serializes each record several times faster than json.dumps
+    import orjson
+    
+    def _json_dumps(data: Dict[str, Any]) -> str:
+        try:
+            return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits; never drop a log record over it
+            return json.dumps(data, default=str)
+except ImportError:
+    def _json_dumps(data: Dict[str, Any]) -> str:
+        return json.dumps(data, default=str)
+
 
 class JSONFormatter(logging.Formatter):
     """Format logs as JSON for better parsing and analysis."""
     
+    # (second, formatted 'YYYY-MM-DDTHH:MM:SS') of the last record; records
+    # arrive in bursts within the same second, so the prefix is reused
+    _second_cache = (None, '')
+    
+    def _utc_timestamp(self, record: logging.LogRecord) -> str:
+        """ISO-8601 UTC timestamp (microseconds) of the record's creation time."""
+        second = int(record.created)
+        cached_second, prefix = self._second_cache
+        if second != cached_second:
+            prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+            self._second_cache = (second, prefix)
+        micros = min(999_999, round((record.created - second) * 1_000_000))
+        return f"{prefix}.{micros:06d}"
+    
     def format(self, record: logging.LogRecord) -> str:
         """Convert log record to JSON."""
         log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': self._utc_timestamp(record),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -34,7 +65,72 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, 'extra'):
             log_data.update(record.extra)
         
-        return json.dumps(log_data, default=str)
+        return _json_dumps(log_data)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a same-process listener.
+    
+    The stock prepare() formats the record and strips exc_info so it can be
+    pickled; the listener here is a thread, so only the message is resolved
+    up front and exc_info is kept for JSONFormatter's 'exception' field.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+# (queue handler, listener) pairs set up by _attach_queued_handlers, by logger name
+_listeners: Dict[str, Any] = {}
+
+
+def _attach_queued_handlers(logger: logging.Logger, *handlers: logging.Handler):
+    """
+    Route a logger's records to handlers through a background thread.
+    
+    Callers only enqueue; formatting and file writes happen on the
+    listener thread, which is flushed and stopped at interpreter exit.
+    Re-attaching replaces (and drains) the logger's previous listener.
+    """
+    _detach_queued_handlers(logger)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = _InProcessQueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[logger.name] = (queue_handler, listener)
+
+
+def _detach_queued_handlers(logger: logging.Logger):
+    """
+    Undo _attach_queued_handlers for a logger, if it has a listener.
+    
+    The listener thread is drained and stopped, and its handlers are closed
+    so their log files are released.
+    """
+    previous = _listeners.pop(logger.name, None)
+    if previous is None:
+        return
+    
+    queue_handler, listener = previous
+    logger.removeHandler(queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+@atexit.register
+def _stop_listeners():
+    """Flush queued records to their handlers before the interpreter exits."""
+    while _listeners:
+        _, (_, listener) = _listeners.popitem()
+        listener.stop()
 
 
 class AuditLogger:
@@ -54,7 +150,7 @@ class AuditLogger:
             backupCount=5
         )
         audit_handler.setFormatter(JSONFormatter())
-        self.logger.addHandler(audit_handler)
+        _attach_queued_handlers(self.logger, audit_handler)
     
     def log_submission(self, user_id: str, submission_data: Dict[str, Any], result: Dict[str, Any]):
         """Log a submission event."""
@@ -114,15 +210,23 @@ def setup_logging(
     Returns:
         Configured logger instance
     """
+    logger = logging.getLogger(app_name)
+    
+    # Already set up with these settings (e.g. app.py repeating the module's
+    # own call, or a re-import): keep the existing handlers and open files
+    settings = (log_level, str(log_dir), enable_file_handler, enable_console_handler)
+    if getattr(logger, '_configured_with', None) == settings:
+        return logger
+    
     # Create logs directory
     log_path = Path(log_dir)
     log_path.mkdir(exist_ok=True)
     
-    # Create logger
-    logger = logging.getLogger(app_name)
     logger.setLevel(getattr(logging, log_level))
     
-    # Remove existing handlers to avoid duplicates
+    # Remove existing handlers to avoid duplicates, stopping the previous
+    # background listener (even if file logging is now off)
+    _detach_queued_handlers(logger)
     logger.handlers.clear()
     
     # Console handler (human-readable)
@@ -138,7 +242,8 @@ def setup_logging(
         console_handler.setFormatter(console_formatter)
         logger.addHandler(console_handler)
     
-    # File handler (JSON format for parsing)
+    # File handlers (JSON format for parsing) are written from a background
+    # thread so request paths never wait on disk
     if enable_file_handler:
         file_handler = logging.handlers.RotatingFileHandler(
             log_path / f"{app_name}.log",
@@ -147,7 +252,6 @@ def setup_logging(
         )
         file_handler.setLevel(getattr(logging, log_level))
         file_handler.setFormatter(JSONFormatter())
-        logger.addHandler(file_handler)
         
         # Error-only file handler
         error_handler = logging.handlers.RotatingFileHandler(
@@ -157,11 +261,13 @@ def setup_logging(
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(JSONFormatter())
-        logger.addHandler(error_handler)
+        
+        _attach_queued_handlers(logger, file_handler, error_handler)
     
     # Prevent propagation to root logger
     logger.propagate = False
     
+    logger._configured_with = settings
     return logger
 
 
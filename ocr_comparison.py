@@ -4,14 +4,94 @@ Compares extracted OCR data with user-entered data to detect discrepancies.
 """
 
 from typing import Dict, List, Tuple, Optional
-from difflib import SequenceMatcher
+from datetime import datetime
+from functools import lru_cache
+import logging
 import re
 from logger_config import audit_logger
 from id_field_mappings import (
-    get_required_match_fields, get_id_type_fields,
+    get_required_match_fields, get_id_type_fields, is_required_match_field,
     ID_TYPE_REGISTRY
 )
 
+# Optional C++ fuzzy matcher; _indel_ratio below is the pure-Python
+# fallback and computes the same score
+try:
+    from rapidfuzz import fuzz, process
+    _have_rapidfuzz = True
+except ImportError:
+    _have_rapidfuzz = False
+
+
+# Date formats normalize_date accepts, grouped by separator so only the
+# formats that can match are tried
+_DATE_FORMATS_BY_SEP = {
+    '-': ('%Y-%m-%d', '%d-%m-%Y'),
+    '/': ('%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d'),
+    '.': ('%d.%m.%Y',),
+}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _indel_ratio(a: str, b: str) -> float:
+    """
+    Similarity 2*LCS/(len(a)+len(b)), the score rapidfuzz's fuzz.ratio
+    reports (as a percentage), so matches don't depend on what is installed.
+    
+    The longest common subsequence uses the bit-parallel recurrence of
+    Hyyrö (2004): one big-int update per character of b.
+    """
+    if not a and not b:
+        return 1.0
+    masks = {}
+    for i, ch in enumerate(a):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    
+    full = (1 << len(a)) - 1
+    v = full
+    for ch in b:
+        u = v & masks.get(ch, 0)
+        v = (v + u) | (v - u)
+    lcs = len(a) - bin(v & full).count('1')
+    
+    return 2.0 * lcs / (len(a) + len(b))
+
+
+# The same user/OCR strings are normalized repeatedly across the fields
+# and retries of a submission, so results are memoized
+@lru_cache(maxsize=2048)
+def normalize_text(text: str) -> str:
+    """Normalize text for comparison: lowercase, remove extra spaces."""
+    if not text:
+        return ""
+    return _WHITESPACE_RE.sub(' ', text.strip().lower())
+
+
+@lru_cache(maxsize=2048)
+def normalize_date(date_str: str) -> str:
+    """Normalize date to YYYY-MM-DD format."""
+    if not date_str:
+        return ""
+    
+    date_str = date_str.strip()
+    for sep, formats in _DATE_FORMATS_BY_SEP.items():
+        if sep in date_str:
+            break
+    else:
+        return date_str
+    
+    # Try common date formats
+    for fmt in formats:
+        try:
+            date_obj = datetime.strptime(date_str, fmt)
+            return date_obj.strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    
+    # Return as-is if no format matches
+    return date_str
+
 
 class FieldComparator:
     """Compares OCR-extracted fields with user-entered fields."""
@@ -27,56 +107,35 @@ class FieldComparator:
         'enum': ['sex', 'gender', 'licence_class'],
     }
     
-    @staticmethod
-    def normalize_text(text: str) -> str:
-        """Normalize text for comparison: lowercase, remove extra spaces."""
-        if not text:
-            return ""
-        return re.sub(r'\s+', ' ', text.strip().lower())
-    
-    @staticmethod
-    def normalize_date(date_str: str) -> str:
-        """Normalize date to YYYY-MM-DD format."""
-        if not date_str:
-            return ""
-        
-        # Try common date formats
-        formats = [
-            '%Y-%m-%d',
-            '%d-%m-%Y',
-            '%d/%m/%Y',
-            '%m/%d/%Y',
-            '%Y/%m/%d',
-            '%d.%m.%Y',
-        ]
-        
-        for fmt in formats:
-            try:
-                from datetime import datetime
-                date_obj = datetime.strptime(date_str.strip(), fmt)
-                return date_obj.strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-        
-        # Return as-is if no format matches
-        return date_str.strip()
+    normalize_text = staticmethod(normalize_text)
+    normalize_date = staticmethod(normalize_date)
     
     @staticmethod
     def fuzzy_match(str1: str, str2: str, threshold: float = 0.85) -> Tuple[bool, float]:
         """
-        Fuzzy string matching using sequence ratio.
+        Fuzzy string matching using the Indel (LCS) similarity ratio.
         Returns (match, similarity_score)
         """
         if not str1 or not str2:
             return False, 0.0
         
-        norm1 = FieldComparator.normalize_text(str1)
-        norm2 = FieldComparator.normalize_text(str2)
+        norm1 = normalize_text(str1)
+        norm2 = normalize_text(str2)
         
         if norm1 == norm2:
             return True, 1.0
         
-        ratio = SequenceMatcher(None, norm1, norm2).ratio()
+        # The ratio is 2*LCS/(len1+len2) and the LCS is at most the shorter
+        # length, so strings of very different length can be rejected
+        # without running the matcher (no score is measured for them)
+        len1, len2 = len(norm1), len(norm2)
+        if 2.0 * min(len1, len2) / (len1 + len2) < threshold:
+            return False, 0.0
+        
+        if _have_rapidfuzz:
+            ratio = fuzz.ratio(norm1, norm2) / 100.0
+        else:
+            ratio = _indel_ratio(norm1, norm2)
         return ratio >= threshold, ratio
     
     @staticmethod
@@ -96,8 +155,8 @@ class FieldComparator:
         if not user_value or not ocr_value:
             return False, "Missing value"
         
-        user_norm = FieldComparator.normalize_date(user_value)
-        ocr_norm = FieldComparator.normalize_date(ocr_value)
+        user_norm = normalize_date(user_value)
+        ocr_norm = normalize_date(ocr_value)
         
         if user_norm == ocr_norm:
             return True, "Date match"
@@ -117,6 +176,43 @@ class FieldComparator:
         
         return False, f"No match: '{user_value}' vs '{ocr_value}' ({score:.0%})"
     
+    @staticmethod
+    def compare_fuzzy_batch(
+        user_value: str,
+        ocr_candidates: List[str],
+        threshold: float = 0.85
+    ) -> Tuple[bool, float, str]:
+        """
+        Fuzzy-match a user value against several OCR candidates at once
+        (e.g. a name OCR split over lines).
+        Returns (match, best_score, best_candidate); when no candidate
+        reaches the threshold the first one is returned with a score of 0.0
+        """
+        if not user_value or not ocr_candidates:
+            return False, 0.0, ""
+        
+        query = normalize_text(user_value)
+        choices = [normalize_text(c) for c in ocr_candidates]
+        
+        if _have_rapidfuzz:
+            # One C call; candidates that cannot reach the cutoff are
+            # abandoned early instead of being scored in full
+            best = process.extractOne(
+                query, choices, scorer=fuzz.ratio, score_cutoff=threshold * 100
+            )
+            if best is None:
+                return False, 0.0, ocr_candidates[0]
+            _, score, index = best
+            score /= 100.0
+        else:
+            scores = [_indel_ratio(query, c) for c in choices]
+            index = max(range(len(scores)), key=scores.__getitem__)
+            score = scores[index]
+            if score < threshold:
+                return False, 0.0, ocr_candidates[0]
+        
+        return True, score, ocr_candidates[index]
+    
     @staticmethod
     def compare_enum(user_value: str, ocr_value: str, enum_values: List[str] = None) -> Tuple[bool, str]:
         """Enum field comparison (sex, gender, class, etc)."""
@@ -143,25 +239,29 @@ class FieldComparator:
         Compare a single field between user input and OCR.
         Returns (match, message, comparison_type)
         """
-        if field_name in cls.COMPARISON_RULES['exact']:
-            match, msg = cls.compare_exact(user_value, ocr_value)
-            return match, msg, 'exact'
-        
-        elif field_name in cls.COMPARISON_RULES['date']:
-            match, msg = cls.compare_date(user_value, ocr_value)
-            return match, msg, 'date'
-        
-        elif field_name in cls.COMPARISON_RULES['fuzzy']:
-            match, msg = cls.compare_fuzzy(user_value, ocr_value, cls.FUZZY_MATCH_THRESHOLD)
-            return match, msg, 'fuzzy'
-        
-        elif field_name in cls.COMPARISON_RULES['enum']:
-            match, msg = cls.compare_enum(user_value, ocr_value)
-            return match, msg, 'enum'
-        
-        # Default: exact match
-        match, msg = cls.compare_exact(user_value, ocr_value)
-        return match, msg, 'default'
+        # Fields without a rule fall back to exact match
+        kind = cls._FIELD_RULE.get(field_name, 'default')
+        match, msg = cls._HANDLERS[kind](user_value, ocr_value)
+        return match, msg, kind
+
+
+# Field -> rule kind, inverted from COMPARISON_RULES so compare_field does a
+# single dict lookup instead of scanning each rule list
+FieldComparator._FIELD_RULE = {
+    field_name: kind
+    for kind, field_names in FieldComparator.COMPARISON_RULES.items()
+    for field_name in field_names
+}
+
+FieldComparator._HANDLERS = {
+    'exact': FieldComparator.compare_exact,
+    'date': FieldComparator.compare_date,
+    'fuzzy': lambda user_value, ocr_value: FieldComparator.compare_fuzzy(
+        user_value, ocr_value, FieldComparator.FUZZY_MATCH_THRESHOLD
+    ),
+    'enum': FieldComparator.compare_enum,
+    'default': FieldComparator.compare_exact,
+}
 
 
 class VerificationResult:
@@ -201,9 +301,8 @@ class VerificationResult:
     
     def is_valid(self) -> bool:
         """Overall validation: all required matches must pass."""
-        required_fields = get_required_match_fields(self.id_type)
-        for field in required_fields:
-            if field in self.failed_fields or field in self.missing_fields:
+        for field in self.failed_fields + self.missing_fields:
+            if is_required_match_field(self.id_type, field):
                 return False
         return True
     
@@ -249,31 +348,62 @@ def compare_user_input_with_ocr(
         'required_fields': required_fields
     })
     
+    # Bind the per-field calls once outside the loop
+    user_get = user_data.get
+    ocr_get = ocr_data.get
+    compare_field = FieldComparator.compare_field
+    compare_fuzzy_batch = FieldComparator.compare_fuzzy_batch
+    field_rule = FieldComparator._FIELD_RULE
+    fuzzy_threshold = FieldComparator.FUZZY_MATCH_THRESHOLD
+    add_comparison = result.add_comparison
+    debug = audit_logger.logger.debug
+    
+    # The audit logger normally runs at INFO; skip building the per-field
+    # debug payload when it would be discarded
+    debug_on = audit_logger.logger.isEnabledFor(logging.DEBUG)
+    
     # Compare each required field
     for field_name in required_fields:
-        user_value = user_data.get(field_name, '')
-        ocr_value = ocr_data.get(field_name, '')
+        user_value = user_get(field_name, '')
+        ocr_value = ocr_get(field_name, '')
         
-        match, message, comp_type = FieldComparator.compare_field(
+        if isinstance(ocr_value, (list, tuple)):
+            # OCR returned several candidates. Names pick the closest in one
+            # batched call; exact, date and enum fields try each candidate
+            # with their own handler and never get fuzzy-scored
+            if not ocr_value:
+                ocr_value = ''
+            elif field_rule.get(field_name) == 'fuzzy':
+                _, _, ocr_value = compare_fuzzy_batch(
+                    user_value, ocr_value, fuzzy_threshold
+                )
+            else:
+                ocr_value = next(
+                    (c for c in ocr_value if compare_field(field_name, user_value, c)[0]),
+                    ocr_value[0]
+                )
+        
+        match, message, comp_type = compare_field(
             field_name, user_value, ocr_value
         )
         
-        result.add_comparison(
+        add_comparison(
             field_name, user_value, ocr_value, match, message, comp_type
         )
         
-        audit_logger.logger.debug(
-            f'Field comparison: {field_name}',
-            extra={
-                'event': 'field_comparison',
-                'field': field_name,
-                'match': match,
-                'comp_type': comp_type,  # Renamed from 'type' to avoid conflict
-                'user_value': user_value[:20] if user_value else '',  # Truncate for logging
-                'ocr_value': ocr_value[:20] if ocr_value else '',
-                'result_message': message  # Renamed from 'message' to avoid logging conflict
-            }
-        )
+        if debug_on:
+            debug(
+                f'Field comparison: {field_name}',
+                extra={
+                    'event': 'field_comparison',
+                    'field': field_name,
+                    'match': match,
+                    'comp_type': comp_type,  # Renamed from 'type' to avoid conflict
+                    'user_value': user_value[:20] if user_value else '',  # Truncate for logging
+                    'ocr_value': ocr_value[:20] if ocr_value else '',
+                    'result_message': message  # Renamed from 'message' to avoid logging conflict
+                }
+            )
     
     # Log overall result
     summary = result.get_summary()
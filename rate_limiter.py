@@ -5,16 +5,32 @@ Prevents abuse and tracks costs.
 
 import time
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
 from threading import Lock
+from dataclasses import dataclass
 from typing import Dict, Tuple, Optional
 from datetime import datetime, timedelta
 from exceptions import RateLimitError, create_error
 
 logger = logging.getLogger(__name__)
 
+# Rate-limit windows are measured on the monotonic clock, which wall-clock
+# (NTP) adjustments cannot move backwards
+_now = time.monotonic
 
-class RateLimiter:
+# Per-user state is guarded by one of this many locks (a power of two), so
+# concurrent requests from different users rarely contend
+_LOCK_STRIPES = 16
+
+
+class _StripedLocks:
+    """Mixin mapping a user id to its lock stripe."""
+    
+    def _lock(self, user_id: str) -> Lock:
+        return self._locks[hash(user_id) & (_LOCK_STRIPES - 1)]
+
+
+class RateLimiter(_StripedLocks):
     """Token bucket rate limiter for API calls."""
     
     def __init__(self, calls_per_minute: int = 10):
@@ -25,12 +41,18 @@ class RateLimiter:
             calls_per_minute: Maximum API calls allowed per minute
         """
         self.calls_per_minute = calls_per_minute
-        self.call_times = defaultdict(list)
-        self.lock = Lock()
+        # Only the newest calls_per_minute timestamps can decide a limit
+        # check, so each user keeps a bounded ring of them (oldest first)
+        self.call_times = defaultdict(lambda: deque(maxlen=self.calls_per_minute))
+        self._locks = tuple(Lock() for _ in range(_LOCK_STRIPES))
     
     def is_allowed(self, user_id: str) -> Tuple[bool, Optional[float]]:
         """
-        Check if user is allowed to make an API call.
+        Check if user is allowed to make an API call, and if so record it.
+        
+        This is the single entry point for gating a call: the check and the
+        recording happen under one lock acquisition, so an allowed call must
+        not also be passed to record_call.
         
         Args:
             user_id: User identifier
@@ -38,45 +60,53 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, wait_time_in_seconds)
         """
-        with self.lock:
-            now = time.time()
-            minute_ago = now - 60
-            
-            # Remove calls older than 1 minute
-            self.call_times[user_id] = [
-                t for t in self.call_times[user_id] if t > minute_ago
-            ]
+        with self._lock(user_id):
+            now = _now()
+            calls = self.call_times[user_id]
             
-            # Check if under limit
-            if len(self.call_times[user_id]) < self.calls_per_minute:
-                self.call_times[user_id].append(now)
+            # Under limit if the ring isn't full or its oldest call has aged
+            # out of the window; appending then evicts that oldest call
+            if len(calls) < self.calls_per_minute or calls[0] <= now - 60:
+                calls.append(now)
                 return True, None
             
             # Calculate wait time
-            oldest_call = self.call_times[user_id][0]
-            wait_time = 60 - (now - oldest_call)
+            wait_time = 60 - (now - calls[0])
             
             return False, max(0, wait_time)
     
     def record_call(self, user_id: str):
-        """Record an API call for a user."""
-        with self.lock:
-            self.call_times[user_id].append(time.time())
+        """
+        Record an API call that was made without going through is_allowed
+        (e.g. replaying calls made elsewhere). Calls gated by is_allowed are
+        already recorded.
+        """
+        with self._lock(user_id):
+            self.call_times[user_id].append(_now())
     
     def get_remaining_calls(self, user_id: str) -> int:
         """Get remaining API calls for user in current minute."""
-        with self.lock:
-            now = time.time()
+        with self._lock(user_id):
+            now = _now()
             minute_ago = now - 60
             
-            recent_calls = [
-                t for t in self.call_times[user_id] if t > minute_ago
-            ]
+            recent_calls = sum(
+                1 for t in self.call_times.get(user_id, ()) if t > minute_ago
+            )
             
-            return max(0, self.calls_per_minute - len(recent_calls))
+            return max(0, self.calls_per_minute - recent_calls)
 
 
-class APIUsageTracker:
+@dataclass
+class UserUsage:
+    """Running API usage totals for one user."""
+    calls: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    total_cost: float = 0.0
+
+
+class APIUsageTracker(_StripedLocks):
     """Track API usage and estimate costs."""
     
     # Gemini API pricing (as of 2024)
@@ -91,15 +121,13 @@ class APIUsageTracker:
         }
     }
     
+    # model -> (input rate, output rate), flattened once for record_api_call
+    _PRICING_FLAT = {model: (p['input'], p['output']) for model, p in PRICING.items()}
+    
     def __init__(self):
         """Initialize usage tracker."""
-        self.usage = defaultdict(lambda: {
-            'calls': 0,
-            'tokens_in': 0,
-            'tokens_out': 0,
-            'total_cost': 0.0
-        })
-        self.lock = Lock()
+        self.usage: Dict[str, UserUsage] = {}
+        self._locks = tuple(Lock() for _ in range(_LOCK_STRIPES))
     
     def record_api_call(
         self,
@@ -120,38 +148,45 @@ class APIUsageTracker:
         Returns:
             Cost of this call in USD
         """
-        with self.lock:
-            if model not in self.PRICING:
-                logger.warning(f"Unknown model for pricing: {model}")
-                return 0.0
-            
-            pricing = self.PRICING[model]
-            call_cost = (
-                tokens_in * pricing['input'] +
-                tokens_out * pricing['output']
-            )
-            
-            self.usage[user_id]['calls'] += 1
-            self.usage[user_id]['tokens_in'] += tokens_in
-            self.usage[user_id]['tokens_out'] += tokens_out
-            self.usage[user_id]['total_cost'] += call_cost
+        rates = self._PRICING_FLAT.get(model)
+        if rates is None:
+            logger.warning("Unknown model for pricing: %s", model)
+            return 0.0
+        
+        input_rate, output_rate = rates
+        call_cost = tokens_in * input_rate + tokens_out * output_rate
+        
+        with self._lock(user_id):
+            usage = self.usage.get(user_id)
+            if usage is None:
+                usage = self.usage[user_id] = UserUsage()
+            usage.calls += 1
+            usage.tokens_in += tokens_in
+            usage.tokens_out += tokens_out
+            usage.total_cost += call_cost
             
             return call_cost
     
     def get_user_cost(self, user_id: str) -> float:
         """Get total cost for user."""
-        with self.lock:
-            return self.usage[user_id]['total_cost']
+        with self._lock(user_id):
+            usage = self.usage.get(user_id)
+            return usage.total_cost if usage is not None else 0.0
     
     def get_user_stats(self, user_id: str) -> Dict:
         """Get usage statistics for user."""
-        with self.lock:
-            stats = self.usage[user_id].copy()
-            stats['average_cost_per_call'] = (
-                stats['total_cost'] / stats['calls']
-                if stats['calls'] > 0 else 0.0
-            )
-            return stats
+        with self._lock(user_id):
+            usage = self.usage.get(user_id) or UserUsage()
+            return {
+                'calls': usage.calls,
+                'tokens_in': usage.tokens_in,
+                'tokens_out': usage.tokens_out,
+                'total_cost': usage.total_cost,
+                'average_cost_per_call': (
+                    usage.total_cost / usage.calls
+                    if usage.calls > 0 else 0.0
+                ),
+            }
     
     def check_quota(
         self,
@@ -168,16 +203,16 @@ class APIUsageTracker:
         Returns:
             Tuple of (within_quota, quota_info_dict)
         """
-        with self.lock:
-            stats = self.usage[user_id]
-            current_cost = stats['total_cost']
+        with self._lock(user_id):
+            usage = self.usage.get(user_id) or UserUsage()
+            current_cost = usage.total_cost
             remaining = max_cost - current_cost
             
             info = {
                 'current_cost': current_cost,
                 'max_cost': max_cost,
                 'remaining': remaining,
-                'api_calls': stats['calls'],
+                'api_calls': usage.calls,
                 'within_quota': remaining > 0,
                 'usage_percent': (current_cost / max_cost * 100) if max_cost > 0 else 0
             }
@@ -221,8 +256,8 @@ class QuotaEnforcer:
         
         if not allowed:
             logger.warning(
-                f"User {user_id} quota exceeded: "
-                f"${info['current_cost']:.2f} of ${info['max_cost']:.2f}"
+                "User %s quota exceeded: $%.2f of $%.2f",
+                user_id, info['current_cost'], info['max_cost']
             )
         
         return allowed, info
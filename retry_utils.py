@@ -2,21 +2,35 @@
 Retry logic with exponential backoff for API calls and resilient operations.
 """
 
+import asyncio
+import random
 import time
 import logging
 from functools import wraps
-from typing import Callable, Any, Type, Tuple
-from exceptions import APIError, create_error
+from threading import Lock
+from typing import Callable, Any, Dict, Optional, Type, Tuple
+from exceptions import APIError, CircuitOpenError, create_error
 
 logger = logging.getLogger(__name__)
 
+# OS-seeded, so workers forked from one parent don't draw the same waits
+_random = random.SystemRandom()
+
+# Jitter strategies: backoff delay -> actual sleep
+_JITTER = {
+    'none': lambda delay: delay,
+    'equal': lambda delay: delay / 2 + _random.uniform(0, delay / 2),
+    'full': lambda delay: _random.uniform(0, delay),
+}
+
 
 def retry_with_backoff(
     max_retries: int = 3,
     initial_delay: float = 1.0,
     backoff_factor: float = 2.0,
     max_delay: float = 60.0,
-    exceptions: Tuple[Type[Exception], ...] = (Exception,)
+    exceptions: Tuple[Type[Exception], ...] = (Exception,),
+    jitter: str = "none"
 ) -> Callable:
     """
     Decorator for retrying functions with exponential backoff.
@@ -27,6 +41,10 @@ def retry_with_backoff(
         backoff_factor: Multiplier for delay after each retry
         max_delay: Maximum delay between retries
         exceptions: Tuple of exceptions to catch and retry on
+        jitter: How to randomize each wait below the backoff delay:
+            "none" (sleep the full delay), "equal" (half the delay plus a
+            random share of the other half) or "full" (anywhere from zero
+            to the delay)
     
     Returns:
         Decorated function
@@ -37,6 +55,10 @@ def retry_with_backoff(
             # API call that might fail
             pass
     """
+    if jitter not in _JITTER:
+        raise ValueError(f"jitter must be one of {sorted(_JITTER)}, got {jitter!r}")
+    jittered = _JITTER[jitter]
+    
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
@@ -48,9 +70,9 @@ def retry_with_backoff(
                     if attempt > 0:
                         logger.info(
                             f"Retrying {func.__name__} (attempt {attempt}/{max_retries}) "
-                            f"after {delay}s delay"
+                            f"after {sleep_for:.3g}s delay"
                         )
-                        time.sleep(delay)
+                        time.sleep(sleep_for)
                     
                     result = func(*args, **kwargs)
                     
@@ -59,15 +81,20 @@ def retry_with_backoff(
                     
                     return result
                 
+                except CircuitOpenError:
+                    # A breaker further down already decided to fail fast
+                    raise
+                
                 except exceptions as e:
                     last_exception = e
                     
                     if attempt < max_retries - 1:
                         # Calculate next delay with backoff
                         delay = min(delay * backoff_factor, max_delay)
+                        sleep_for = jittered(delay)
                         logger.warning(
                             f"{func.__name__} failed (attempt {attempt + 1}/{max_retries}): {e}. "
-                            f"Retrying in {delay}s..."
+                            f"Retrying in {sleep_for:.3g}s..."
                         )
                     else:
                         logger.error(
@@ -90,6 +117,251 @@ def retry_with_backoff(
     return decorator
 
 
+def _retry_after_seconds(exc: Exception):
+    """Return the server-requested retry delay carried by exc, or None."""
+    # Google API errors expose a RetryInfo delay (Duration or timedelta)
+    retry_delay = getattr(exc, 'retry_delay', None)
+    if retry_delay is not None:
+        if isinstance(retry_delay, (int, float)):
+            return float(retry_delay)
+        if hasattr(retry_delay, 'total_seconds'):
+            return retry_delay.total_seconds()
+        if hasattr(retry_delay, 'seconds'):
+            return retry_delay.seconds + getattr(retry_delay, 'nanos', 0) / 1e9
+    
+    # HTTP errors may carry a Retry-After header (seconds form)
+    headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    if headers and headers.get('Retry-After'):
+        try:
+            return float(headers['Retry-After'])
+        except ValueError:
+            return None
+    return None
+
+
+def async_retry_with_backoff(
+    max_retries: int = 3,
+    initial_delay: float = 1.0,
+    backoff_factor: float = 2.0,
+    max_delay: float = 60.0,
+    exceptions: Tuple[Type[Exception], ...] = (Exception,),
+    jitter: str = "equal"
+) -> Callable:
+    """
+    Decorator for retrying coroutines with jittered exponential backoff.
+    
+    Waits with asyncio.sleep so other tasks keep running, and uses the
+    server's requested delay (Retry-After / RetryInfo) when the exception
+    carries one.
+    
+    Args:
+        max_retries: Maximum number of attempts
+        initial_delay: Initial delay in seconds
+        backoff_factor: Multiplier for delay after each retry
+        max_delay: Maximum delay between retries
+        exceptions: Tuple of exceptions to catch and retry on
+        jitter: Randomization of the backoff delay, as for retry_with_backoff
+            ("equal" keeps concurrent callers from retrying in lockstep)
+    
+    Returns:
+        Decorated coroutine function
+    """
+    if jitter not in _JITTER:
+        raise ValueError(f"jitter must be one of {sorted(_JITTER)}, got {jitter!r}")
+    jittered = _JITTER[jitter]
+    
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            delay = initial_delay
+            
+            for attempt in range(max_retries):
+                try:
+                    return await func(*args, **kwargs)
+                
+                except CircuitOpenError:
+                    raise
+                
+                except exceptions as e:
+                    if attempt == max_retries - 1:
+                        logger.error(
+                            f"{func.__name__} failed after {max_retries} attempts: {e}"
+                        )
+                        raise
+                    
+                    wait = _retry_after_seconds(e)
+                    if wait is None:
+                        wait = jittered(delay)
+                        delay = min(delay * backoff_factor, max_delay)
+                    wait = min(wait, max_delay)
+                    
+                    logger.warning(
+                        f"{func.__name__} failed (attempt {attempt + 1}/{max_retries}): {e}. "
+                        f"Retrying in {wait:.1f}s..."
+                    )
+                    await asyncio.sleep(wait)
+        
+        return wrapper
+    
+    return decorator
+
+
+class CircuitBreaker:
+    """
+    Closed/Open/Half-Open circuit breaker for one downstream call.
+    
+    Closed passes calls through and counts consecutive failures; reaching
+    failure_threshold opens the circuit. Open rejects calls until
+    reset_timeout has passed, then lets a single probe through (Half-Open).
+    A successful probe closes the circuit, a failed one reopens it. If the
+    probe never reports back, another is admitted after reset_timeout.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize circuit breaker.
+        
+        Args:
+            name: Name of the guarded call, used in logs and errors
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before probing again
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self._lock = Lock()
+    
+    def before_call(self):
+        """
+        Admit a call or fail fast.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open (or a probe is in flight)
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise create_error(
+                    'API_UNAVAILABLE',
+                    message=f"Circuit open for {self.name}; next attempt in {remaining:.1f}s",
+                    details={'circuit': self.name, 'retry_after': remaining},
+                    exception_class=CircuitOpenError
+                )
+            
+            # Admit this caller as the probe; others wait out another timeout
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+        
+        logger.info(f"Circuit for {self.name} half-open, probing")
+    
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.failure_count = 0
+    
+    def record_failure(self):
+        """Count a failed call, opening the circuit at the threshold."""
+        with self._lock:
+            if self.state == self.OPEN:
+                # A call admitted before the circuit opened, failing late
+                return
+            
+            self.failure_count += 1
+            if self.state == self.HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                logger.warning(
+                    f"Circuit for {self.name} opened after {self.failure_count} "
+                    f"consecutive failure(s); failing fast for {self.reset_timeout}s"
+                )
+
+
+# One breaker per guarded function, shared by every caller
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = Lock()
+
+
+def get_circuit_breaker(
+    name: str,
+    failure_threshold: int = 5,
+    reset_timeout: float = 30.0
+) -> CircuitBreaker:
+    """Get the circuit breaker registered under name, creating it if needed."""
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(name)
+        if breaker is None:
+            breaker = _circuit_breakers[name] = CircuitBreaker(
+                name, failure_threshold, reset_timeout
+            )
+        return breaker
+
+
+def circuit_breaker(
+    failure_threshold: int = 5,
+    reset_timeout: float = 30.0,
+    exceptions: Tuple[Type[Exception], ...] = (Exception,),
+    name: Optional[str] = None
+) -> Callable:
+    """
+    Decorator that stops calling a failing function until it recovers.
+    
+    Breakers are process-wide: every session calling the function shares
+    one circuit, so once it opens all users fail fast. Only exceptions in
+    the given tuple count as failures, so pass outage-type errors only;
+    per-request problems (bad input, a user's quota) must not be listed or
+    one user could open the circuit for everyone. A CircuitOpenError from
+    a nested breaker is passed through without counting. Place it outside
+    retry_with_backoff so an open circuit skips the retries too.
+    
+    Args:
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds to stay open before probing again
+        exceptions: Tuple of exceptions that count as failures
+        name: Registry key, to share one breaker between functions that
+            call the same upstream (defaults to module.qualname)
+    
+    Returns:
+        Decorated function
+    """
+    def decorator(func: Callable) -> Callable:
+        breaker = get_circuit_breaker(
+            name or f"{func.__module__}.{func.__qualname__}",
+            failure_threshold,
+            reset_timeout
+        )
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            breaker.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except CircuitOpenError:
+                raise
+            except exceptions:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return result
+        
+        wrapper.circuit_breaker = breaker
+        return wrapper
+    
+    return decorator
+
+
 class RetryConfig:
     """Configuration for retry behavior."""
     
@@ -110,28 +382,51 @@ class RetryConfig:
     FILE_INITIAL_DELAY = 0.1
     FILE_BACKOFF_FACTOR = 2.0
     FILE_MAX_DELAY = 10.0
+    
+    # Full jitter spreads out callers that failed together (e.g. every
+    # worker hitting the same Gemini outage) instead of retrying in waves
+    JITTER = "full"
+    
+    # Circuit breaker defaults (API and network calls)
+    CIRCUIT_FAILURE_THRESHOLD = 5
+    CIRCUIT_RESET_TIMEOUT = 30.0
 
 
 def retry_api_call(func: Callable) -> Callable:
-    """Decorator for API calls with standard retry configuration."""
-    return retry_with_backoff(
+    """Decorator for API calls with standard retry and circuit breaker configuration."""
+    failures = (TimeoutError, APIError, ConnectionError)
+    retried = retry_with_backoff(
         max_retries=RetryConfig.API_MAX_RETRIES,
         initial_delay=RetryConfig.API_INITIAL_DELAY,
         backoff_factor=RetryConfig.API_BACKOFF_FACTOR,
         max_delay=RetryConfig.API_MAX_DELAY,
-        exceptions=(TimeoutError, APIError, ConnectionError)
+        jitter=RetryConfig.JITTER,
+        exceptions=failures
     )(func)
+    return circuit_breaker(
+        failure_threshold=RetryConfig.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=RetryConfig.CIRCUIT_RESET_TIMEOUT,
+        exceptions=failures
+    )(retried)
 
 
 def retry_network_call(func: Callable) -> Callable:
-    """Decorator for network calls with standard retry configuration."""
-    return retry_with_backoff(
+    """Decorator for network calls with standard retry and circuit breaker configuration."""
+    retried = retry_with_backoff(
         max_retries=RetryConfig.NETWORK_MAX_RETRIES,
         initial_delay=RetryConfig.NETWORK_INITIAL_DELAY,
         backoff_factor=RetryConfig.NETWORK_BACKOFF_FACTOR,
         max_delay=RetryConfig.NETWORK_MAX_DELAY,
+        jitter=RetryConfig.JITTER,
         exceptions=(TimeoutError, ConnectionError, IOError)
     )(func)
+    # Only connection and timeout errors say the upstream is down; other
+    # OSErrors (a missing or unreadable local file) must not open the circuit
+    return circuit_breaker(
+        failure_threshold=RetryConfig.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=RetryConfig.CIRCUIT_RESET_TIMEOUT,
+        exceptions=(TimeoutError, ConnectionError)
+    )(retried)
 
 
 def retry_file_operation(func: Callable) -> Callable:
@@ -141,6 +436,7 @@ def retry_file_operation(func: Callable) -> Callable:
         initial_delay=RetryConfig.FILE_INITIAL_DELAY,
         backoff_factor=RetryConfig.FILE_BACKOFF_FACTOR,
         max_delay=RetryConfig.FILE_MAX_DELAY,
+        jitter=RetryConfig.JITTER,
         exceptions=(IOError, OSError, FileNotFoundError)
     )(func)
 
@@ -4,7 +4,9 @@ Handles API keys and sensitive configuration securely.
 """
 
 import os
+import re
 import logging
+from functools import lru_cache
 from typing import Optional, Dict, Any, Tuple
 from dotenv import load_dotenv
 from exceptions import ConfigurationError, SecurityError, create_error
@@ -112,7 +114,8 @@ class SecretsManager:
     def get_config_value(
         key: str,
         default: Any = None,
-        type_cast: type = str
+        type_cast: type = str,
+        env: Optional[Dict[str, str]] = None
     ) -> Any:
         """
         Get configuration value from environment.
@@ -121,11 +124,12 @@ class SecretsManager:
             key: Environment variable name
             default: Default value if not found
             type_cast: Type to cast value to
+            env: Snapshot of the environment to read instead of os.environ
         
         Returns:
             Configuration value
         """
-        value = os.getenv(key, default)
+        value = (os.environ if env is None else env).get(key, default)
         
         if value is not None and type_cast != str:
             try:
@@ -137,6 +141,15 @@ class SecretsManager:
         return value
 
 
+@lru_cache(maxsize=32)
+def _sensitive_pattern(fields: Tuple[str, ...]) -> re.Pattern:
+    """Compile one case-insensitive alternation matching any of the fields."""
+    return re.compile("|".join(map(re.escape, sorted(fields))), re.IGNORECASE)
+
+
+_DEFAULT_SENSITIVE_RE = _sensitive_pattern(('api_key', 'password', 'token', 'secret'))
+
+
 class SecurityValidator:
     """Validate security-related configurations."""
     
@@ -188,15 +201,15 @@ class SecurityValidator:
         Returns:
             True if no sensitive data detected
         """
-        if not sensitive_fields:
-            sensitive_fields = ['api_key', 'password', 'token', 'secret']
-        
-        data_lower = data.lower()
-        
-        for field in sensitive_fields:
-            if field in data_lower:
-                logger.warning(f"Potential sensitive data detected: {field}")
-                return False
+        pattern = (
+            _sensitive_pattern(tuple(sensitive_fields)) if sensitive_fields
+            else _DEFAULT_SENSITIVE_RE
+        )
+        
+        match = pattern.search(data)
+        if match:
+            logger.warning(f"Potential sensitive data detected: {match.group().lower()}")
+            return False
         
         return True
 
@@ -224,18 +237,35 @@ class ConfigurationValidator:
     }
     
     @classmethod
-    def validate_all(cls) -> Tuple[bool, Dict[str, str]]:
+    def _read_env(cls) -> Dict[str, str]:
+        """Snapshot the configuration keys (only those) from os.environ."""
+        environ = os.environ
+        return {
+            key: environ[key]
+            for key in (*cls.REQUIRED_CONFIGS, *cls.OPTIONAL_CONFIGS)
+            if key in environ
+        }
+    
+    @classmethod
+    def validate_all(cls, env: Optional[Dict[str, str]] = None) -> Tuple[bool, Dict[str, str]]:
         """
         Validate all required configurations.
         
+        Args:
+            env: Snapshot of the configuration keys to validate (read from
+                os.environ if not given)
+        
         Returns:
             Tuple of (is_valid, errors_dict)
         """
+        if env is None:
+            env = cls._read_env()
+        
         errors = {}
         
         # Check required configs
         for config_key, expected_type in cls.REQUIRED_CONFIGS.items():
-            value = os.getenv(config_key)
+            value = env.get(config_key)
             
             if not value:
                 errors[config_key] = f"Required configuration missing"
@@ -251,7 +281,7 @@ class ConfigurationValidator:
         
         # Validate optional configs if provided
         for config_key, expected_type in cls.OPTIONAL_CONFIGS.items():
-            value = os.getenv(config_key)
+            value = env.get(config_key)
             
             if value:
                 try:
@@ -275,7 +305,9 @@ class ConfigurationValidator:
         Raises:
             ConfigurationError: If validation fails
         """
-        is_valid, errors = cls.validate_all()
+        # Validate and build the config from one read of the environment
+        env = cls._read_env()
+        is_valid, errors = cls.validate_all(env)
         
         if not is_valid:
             error_msg = "; ".join([f"{k}: {v}" for k, v in errors.items()])
@@ -290,7 +322,7 @@ class ConfigurationValidator:
         
         # Add required configs
         for config_key in cls.REQUIRED_CONFIGS.keys():
-            config[config_key] = os.getenv(config_key)
+            config[config_key] = env.get(config_key)
         
         # Add optional configs with defaults
         for config_key, type_cast in cls.OPTIONAL_CONFIGS.items():
@@ -298,7 +330,8 @@ class ConfigurationValidator:
             config[config_key] = SecretsManager.get_config_value(
                 config_key,
                 default=default,
-                type_cast=type_cast
+                type_cast=type_cast,
+                env=env
             )
         
         logger.info("Configuration validated successfully")
@@ -6,6 +6,9 @@ This package contains comprehensive tests for all core modules:
 - test_exceptions.py: Custom exception handling
 - test_rate_limiter.py: Rate limiting and usage tracking
 - test_retry_utils.py: Retry logic with exponential backoff
+- test_face_comparison.py: Face comparison image helpers
+- test_repository.py: Cached repository aggregates
+- test_logger_config.py: Logger setup and reconfiguration
 
 To run all tests:
     pytest tests/ -v
@@ -0,0 +1,57 @@
+"""
+Unit tests for face comparison helpers.
+"""
+
+import numpy as np
+from PIL import Image
+from face_comparison import (
+    _as_array,
+    _color_histogram,
+    _features_cannot_change_match,
+    MATCH_THRESHOLD,
+)
+
+
+def test_as_array_converts_rgba_to_rgb():
+    """RGBA uploads are viewed as 3-channel RGB arrays."""
+    img = Image.new('RGBA', (40, 30), (10, 20, 30, 128))
+    
+    array, rgb = _as_array(img)
+    
+    assert rgb is True
+    assert array.shape == (30, 40, 3)
+    assert tuple(array[0, 0]) == (10, 20, 30)
+
+
+def test_as_array_converts_grayscale_to_rgb():
+    """Grayscale images are expanded to 3 identical channels."""
+    img = Image.new('L', (40, 30), 90)
+    
+    array, rgb = _as_array(img)
+    
+    assert rgb is True
+    assert array.shape == (30, 40, 3)
+    assert tuple(array[0, 0]) == (90, 90, 90)
+
+
+def test_color_histogram_accepts_converted_images():
+    """Histograms of converted RGBA and grayscale images are normalized 512-bin."""
+    for img in (Image.new('RGBA', (16, 16), (255, 0, 0, 0)), Image.new('L', (16, 16), 200)):
+        array, _ = _as_array(img)
+        hist = _color_histogram(array)
+        
+        assert hist.shape == (512,)
+        assert np.isclose(hist.sum(), 1.0)
+
+
+def test_features_skipped_only_when_decision_is_fixed():
+    """ORB is skipped only if every feature score gives the same decision."""
+    # High histogram, low SSIM: 0.625 without features but 0.417 with 0
+    assert not _features_cannot_change_match({'histogram': 0.95, 'ssim': 0.3}, MATCH_THRESHOLD)
+    # Low histogram, high SSIM: 0.525 without features but 0.683 with 1
+    assert not _features_cannot_change_match({'histogram': 0.05, 'ssim': 1.0}, MATCH_THRESHOLD)
+    
+    # Clear match: even features=0 scores (0.95 + 0.9) / 3 >= 0.6
+    assert _features_cannot_change_match({'histogram': 0.95, 'ssim': 0.9}, MATCH_THRESHOLD)
+    # Clear mismatch: even features=1 scores (0.05 + 0.2 + 1) / 3 < 0.6
+    assert _features_cannot_change_match({'histogram': 0.05, 'ssim': 0.2}, MATCH_THRESHOLD)
@@ -5,6 +5,7 @@ Comprehensive test of face detection, extraction, and comparison.
 """
 
 import os
+import numpy as np
 from PIL import Image
 from id_face_detector import IDCardFaceDetector, detect_and_extract_id_face, compare_faces_advanced
 
@@ -148,5 +149,45 @@ def test_id_face_detection():
     print(f"   ✓ Detailed similarity scoring")
 
 
+def test_detect_faces_robust_leaves_input_untouched():
+    """Detection works on the caller's array without copying or modifying it."""
+    detector = IDCardFaceDetector()
+    
+    # Small enough that no downscaled copy is made
+    img = np.full((400, 600, 3), 200, dtype=np.uint8)
+    img[100:300, 200:400] = 40
+    snapshot = img.copy()
+    address = img.ctypes.data
+    
+    faces, method, preprocessed = detector.detect_faces_robust(img)
+    
+    assert img.ctypes.data == address
+    assert np.array_equal(img, snapshot)
+
+
+
+def test_detect_faces_robust_rescales_boxes_to_original_size():
+    """Boxes found on the downscaled copy are mapped back to full resolution."""
+    detector = IDCardFaceDetector()
+    
+    # 1280 px wide: detection runs on a 640 px copy, i.e. at half scale
+    img = np.full((960, 1280, 3), 200, dtype=np.uint8)
+    seen_shapes = []
+    
+    def fake_cascade(preprocessed, gray, min_confidence=0.5):
+        seen_shapes.append(preprocessed.shape[:2])
+        return [(100, 50, 40, 60)], "fake"
+    
+    detector._detect_cascade = fake_cascade
+    
+    faces, method, preprocessed = detector.detect_faces_robust(img)
+    
+    assert seen_shapes == [(480, 640)]
+    assert faces == [(200, 100, 80, 120)]
+    assert preprocessed.shape[:2] == img.shape[:2]
+
+
 if __name__ == "__main__":
     test_id_face_detection()
+    test_detect_faces_robust_leaves_input_untouched()
+    test_detect_faces_robust_rescales_boxes_to_original_size()
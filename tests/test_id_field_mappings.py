@@ -242,7 +242,7 @@ class TestUtilityFunctions:
     def test_get_required_match_fields(self):
         """Should get required match fields."""
         fields = get_required_match_fields('Ghana Card')
-        assert isinstance(fields, list)
+        assert isinstance(fields, tuple)
         assert len(fields) > 0
         # ghana_pin should be required
         assert 'ghana_pin' in fields
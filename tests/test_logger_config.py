@@ -0,0 +1,55 @@
+"""
+Unit tests for logging setup.
+"""
+
+import pytest
+import logging
+from logger_config import setup_logging, _listeners
+
+
+class TestSetupLogging:
+    """Test logger configuration and reconfiguration."""
+    
+    def test_same_settings_keep_handlers(self, tmp_path):
+        """Test repeating setup with the same settings reuses the handlers."""
+        logger = setup_logging('test_repeat', log_dir=str(tmp_path), enable_console_handler=False)
+        handlers = list(logger.handlers)
+        
+        again = setup_logging('test_repeat', log_dir=str(tmp_path), enable_console_handler=False)
+        
+        assert again is logger
+        assert again.handlers == handlers
+    
+    def test_reconfigure_stops_previous_listener(self, tmp_path):
+        """Test setup with new settings stops the old listener and closes its files."""
+        setup_logging('test_reconfigure', log_dir=str(tmp_path), enable_console_handler=False)
+        old_queue_handler, old_listener = _listeners['test_reconfigure']
+        
+        logger = setup_logging(
+            'test_reconfigure', log_level='DEBUG', log_dir=str(tmp_path),
+            enable_console_handler=False
+        )
+        
+        assert old_listener._thread is None
+        assert all(handler.stream is None for handler in old_listener.handlers)
+        assert old_queue_handler not in logger.handlers
+        assert len(logger.handlers) == 1
+        assert logger.level == logging.DEBUG
+    
+    def test_disabling_file_handler_stops_listener(self, tmp_path):
+        """Test turning file logging off on reconfigure stops the listener."""
+        setup_logging('test_file_off', log_dir=str(tmp_path), enable_console_handler=False)
+        _, old_listener = _listeners['test_file_off']
+        
+        logger = setup_logging(
+            'test_file_off', log_dir=str(tmp_path),
+            enable_file_handler=False, enable_console_handler=False
+        )
+        
+        assert old_listener._thread is None
+        assert 'test_file_off' not in _listeners
+        assert logger.handlers == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
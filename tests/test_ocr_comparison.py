@@ -6,9 +6,13 @@ Tests FieldComparator, VerificationResult, and compare_user_input_with_ocr.
 import pytest
 from datetime import datetime, timedelta
 from ocr_comparison import (
-    FieldComparator, VerificationResult, compare_user_input_with_ocr
+    FieldComparator, VerificationResult, compare_user_input_with_ocr,
+    _indel_ratio, _have_rapidfuzz
 )
 
+if _have_rapidfuzz:
+    from rapidfuzz import fuzz
+
 
 class TestFieldComparatorNormalization:
     """Test text and date normalization."""
@@ -86,6 +90,31 @@ class TestFieldComparatorFuzzyMatch:
             "John Smith", "John Smth", threshold=0.95
         )
         assert match is False
+    
+    def test_length_prefilter_reports_no_score(self):
+        """Should report 0.0, not the length bound, when rejected by length."""
+        match, score = FieldComparator.fuzzy_match("Jo", "Johnathan Smith")
+        assert match is False
+        assert score == 0.0
+    
+    def test_fallback_ratio_values(self):
+        """Pure-Python ratio is 2*LCS/(len1+len2)."""
+        assert _indel_ratio("john smith", "john smth") == pytest.approx(18 / 19)
+        assert _indel_ratio("kwame", "kwame") == 1.0
+        assert _indel_ratio("abc", "xyz") == 0.0
+    
+    @pytest.mark.skipif(not _have_rapidfuzz, reason="rapidfuzz not installed")
+    def test_fallback_agrees_with_rapidfuzz(self):
+        """Both backends give the same score, so thresholds behave the same."""
+        pairs = [
+            ("john smith", "john smth"),
+            ("john smith", "jon smith"),
+            ("kwame nkrumah", "kwame nkruma"),
+            ("ama serwaa", "amma serwah"),
+            ("john smith", "jane doe"),
+        ]
+        for a, b in pairs:
+            assert _indel_ratio(a, b) == pytest.approx(fuzz.ratio(a, b) / 100.0)
 
 
 class TestFieldComparatorExactMatch:
@@ -376,6 +405,46 @@ class TestCompareUserInputWithOCR:
         # Should match after normalization
         assert result.is_valid()
     
+    def test_name_candidates_use_fuzzy_batch(self):
+        """Should match a name against the closest of several OCR candidates."""
+        user_data = {'full_name': 'John Smith'}
+        ocr_data = {'full_name': ['REPUBLIC OF GHANA', 'JOHN SMTH']}
+        
+        result = compare_user_input_with_ocr('Ghana Card', user_data, ocr_data)
+        
+        comparison = result.field_comparisons['full_name']
+        assert comparison['ocr_value'] == 'JOHN SMTH'
+        assert comparison['type'] == 'fuzzy'
+        assert 'full_name' in result.passed_fields
+    
+    def test_exact_and_date_candidates_use_their_handlers(self):
+        """Should compare exact and date candidates without fuzzy scoring."""
+        user_data = {
+            'ghana_pin': 'GHA-123456789-0',
+            'date_of_birth': '1985-05-15',
+        }
+        ocr_data = {
+            # A near-identical PIN must not be accepted by similarity
+            'ghana_pin': ['GHA-123456789-1', 'GHA-123456789-0'],
+            'date_of_birth': ['2030-12-31', '15/05/1985'],
+        }
+        
+        result = compare_user_input_with_ocr('Ghana Card', user_data, ocr_data)
+        
+        pin = result.field_comparisons['ghana_pin']
+        dob = result.field_comparisons['date_of_birth']
+        assert (pin['type'], pin['ocr_value'], pin['match']) == ('exact', 'GHA-123456789-0', True)
+        assert (dob['type'], dob['ocr_value'], dob['match']) == ('date', '15/05/1985', True)
+    
+    def test_exact_candidates_without_match_fail(self):
+        """Should fail an exact field when no candidate matches exactly."""
+        user_data = {'ghana_pin': 'GHA-123456789-0'}
+        ocr_data = {'ghana_pin': ['GHA-123456789-1', 'GHA-123456789-2']}
+        
+        result = compare_user_input_with_ocr('Ghana Card', user_data, ocr_data)
+        
+        assert 'ghana_pin' in result.failed_fields
+    
     def test_invalid_id_type(self):
         """Should handle invalid ID type gracefully."""
         user_data = {'field': 'value'}
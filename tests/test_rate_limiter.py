@@ -4,6 +4,8 @@ Unit tests for rate limiting and usage tracking.
 
 import pytest
 import time
+from concurrent.futures import ThreadPoolExecutor
+import rate_limiter
 from rate_limiter import (
     RateLimiter,
     APIUsageTracker,
@@ -81,6 +83,40 @@ class TestRateLimiter:
         remaining = limiter.get_remaining_calls("user_1")
         assert remaining == 3
 
+    
+    def test_rate_limiter_concurrent_calls_never_exceed_limit(self):
+        """Test concurrent checks for one user allow exactly the limit."""
+        limiter = RateLimiter(calls_per_minute=5)
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: limiter.is_allowed("user_1")[0], range(50)))
+        
+        assert results.count(True) == 5
+        assert limiter.get_remaining_calls("user_1") == 0
+    
+    def test_rate_limiter_window_evicts_old_calls(self, monkeypatch):
+        """Test calls older than the 60s window stop counting."""
+        clock = [1000.0]
+        monkeypatch.setattr(rate_limiter, '_now', lambda: clock[0])
+        limiter = RateLimiter(calls_per_minute=2)
+        
+        limiter.is_allowed("user_1")
+        clock[0] += 30
+        limiter.is_allowed("user_1")
+        
+        allowed, wait_time = limiter.is_allowed("user_1")
+        assert allowed is False
+        assert wait_time == pytest.approx(30)
+        
+        # The first call ages out; the second still counts
+        clock[0] += 30
+        assert limiter.get_remaining_calls("user_1") == 1
+        allowed, _ = limiter.is_allowed("user_1")
+        assert allowed is True
+        allowed, wait_time = limiter.is_allowed("user_1")
+        assert allowed is False
+        assert wait_time == pytest.approx(30)
+
 
 class TestAPIUsageTracker:
     """Test API usage tracking."""
@@ -188,6 +224,33 @@ class TestAPIUsageTracker:
         expected_cost = 0.075 + 0.30
         assert cost == pytest.approx(expected_cost)
 
+    
+    def test_pricing_calculation_second_model(self):
+        """Test pricing uses each model's own rates."""
+        tracker = APIUsageTracker()
+        
+        cost = tracker.record_api_call("user_1", "gemini-2.0-flash", 2_000_000, 500_000)
+        
+        # Expected: 2 * 0.10 + 0.5 * 0.40 = $0.40
+        assert cost == pytest.approx(0.40)
+        assert tracker.get_user_cost("user_1") == pytest.approx(0.40)
+    
+    def test_concurrent_calls_are_all_counted(self):
+        """Test concurrent records for one user lose no updates."""
+        tracker = APIUsageTracker()
+        
+        def record(_):
+            return tracker.record_api_call("user_1", "gemini-1.5-flash", 1000, 500)
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            costs = list(executor.map(record, range(200)))
+        
+        stats = tracker.get_user_stats("user_1")
+        assert stats['calls'] == 200
+        assert stats['tokens_in'] == 200_000
+        assert stats['tokens_out'] == 100_000
+        assert stats['total_cost'] == pytest.approx(sum(costs))
+
 
 class TestQuotaEnforcer:
     """Test quota enforcement."""
@@ -0,0 +1,85 @@
+"""
+Unit tests for the repository's cached aggregates.
+"""
+
+import pytest
+from database.repository import _cached_stats, _invalidate_stats, _stats_cache, clear_stats_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_stats_cache():
+    """Start and finish every test with an empty cache."""
+    clear_stats_cache()
+    yield
+    clear_stats_cache()
+
+
+def _counting():
+    """Return a compute callable that records how often it ran."""
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return {'total': 3, 'id_type_breakdown': {'Ghana Card': 3}}
+    
+    return compute, calls
+
+
+def test_cached_stats_hit_skips_compute():
+    """A second call within the TTL is served from the cache."""
+    compute, calls = _counting()
+    
+    first = _cached_stats('stats', 'user_1', 30, compute)
+    second = _cached_stats('stats', 'user_1', 30, compute)
+    
+    assert first == second
+    assert len(calls) == 1
+
+
+def test_cached_stats_returns_independent_copies():
+    """Mutating a returned nested dict does not change the cached entry."""
+    compute, _ = _counting()
+    
+    first = _cached_stats('stats', 'user_1', 30, compute)
+    first['id_type_breakdown']['Ghana Card'] = 99
+    first['total'] = 0
+    
+    second = _cached_stats('stats', 'user_1', 30, compute)
+    assert second == {'total': 3, 'id_type_breakdown': {'Ghana Card': 3}}
+
+
+def test_invalidate_drops_entries_for_user_and_totals():
+    """A write for a user recomputes that user's and the system-wide stats."""
+    compute, calls = _counting()
+    
+    _cached_stats('stats', 'user_1', 30, compute)
+    _cached_stats('stats', 'user_2', 30, compute)
+    _cached_stats('stats', None, 30, compute)
+    assert len(calls) == 3
+    
+    _invalidate_stats('user_1')
+    
+    _cached_stats('stats', 'user_1', 30, compute)
+    _cached_stats('stats', None, 30, compute)
+    assert len(calls) == 5
+    
+    # Other users' entries are untouched
+    _cached_stats('stats', 'user_2', 30, compute)
+    assert len(calls) == 5
+    
+    # Invalidation removes entries rather than leaving per-user state behind
+    _invalidate_stats('user_3')
+    assert set(key[1] for key in _stats_cache) == {'user_1', 'user_2'}
+
+
+def test_result_computed_across_a_write_is_not_cached():
+    """A result that may predate a concurrent write is returned but not stored."""
+    calls = []
+    
+    def compute_during_write():
+        calls.append(1)
+        _invalidate_stats('user_1')
+        return {'total': len(calls)}
+    
+    assert _cached_stats('stats', 'user_1', 30, compute_during_write) == {'total': 1}
+    assert _cached_stats('stats', 'user_1', 30, compute_during_write) == {'total': 2}
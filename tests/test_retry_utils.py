@@ -4,13 +4,17 @@ Unit tests for retry logic.
 
 import pytest
 import time
+import asyncio
 from retry_utils import (
     retry_with_backoff,
+    async_retry_with_backoff,
     retry_api_call,
     retry_network_call,
     retry_file_operation,
-    RetryConfig
+    RetryConfig,
+    circuit_breaker,
 )
+from exceptions import CircuitOpenError
 
 
 class TestRetryDecorator:
@@ -116,6 +120,76 @@ class TestRetryDecorator:
         # Max delay should cap the wait times
         assert elapsed < 2.0  # Should be much less than unlimited backoff
     
+    def test_retry_full_jitter_stays_under_backoff_delay(self, monkeypatch):
+        """Test full jitter samples each sleep from [0, backoff delay]."""
+        import retry_utils
+        
+        draws = []
+        sleeps = []
+        
+        def fake_uniform(low, high):
+            draws.append((low, high))
+            return high * 0.25
+        
+        monkeypatch.setattr(retry_utils._random, 'uniform', fake_uniform)
+        monkeypatch.setattr(retry_utils.time, 'sleep', sleeps.append)
+        
+        @retry_with_backoff(
+            max_retries=4,
+            initial_delay=1.0,
+            backoff_factor=2.0,
+            max_delay=5.0,
+            jitter="full"
+        )
+        def fail_func():
+            raise ConnectionError("Fail")
+        
+        with pytest.raises(ConnectionError):
+            fail_func()
+        
+        # Backoff delays 2, 4, then capped at 5; each sleep is a draw below it
+        assert draws == [(0, 2.0), (0, 4.0), (0, 5.0)]
+        assert sleeps == [0.5, 1.0, 1.25]
+        assert all(0 <= wait <= high for wait, (_, high) in zip(sleeps, draws))
+    
+    def test_async_retry_uses_jitter_strategy(self, monkeypatch):
+        """Test the async decorator samples waits from the chosen jitter mode."""
+        import retry_utils
+        
+        draws = []
+        sleeps = []
+        
+        def fake_uniform(low, high):
+            draws.append((low, high))
+            return high
+        
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+        
+        monkeypatch.setattr(retry_utils._random, 'uniform', fake_uniform)
+        monkeypatch.setattr(retry_utils.asyncio, 'sleep', fake_sleep)
+        
+        @async_retry_with_backoff(
+            max_retries=3,
+            initial_delay=1.0,
+            backoff_factor=2.0,
+            exceptions=(ConnectionError,),
+            jitter="full"
+        )
+        async def fail_func():
+            raise ConnectionError("Fail")
+        
+        with pytest.raises(ConnectionError):
+            asyncio.run(fail_func())
+        
+        assert draws == [(0, 1.0), (0, 2.0)]
+        assert sleeps == [1.0, 2.0]
+    
+    def test_retry_rejects_unknown_jitter(self):
+        """Test an unknown jitter mode is rejected up front."""
+        with pytest.raises(ValueError):
+            retry_with_backoff(jitter="partial")
+    
     def test_retry_specific_exceptions(self):
         """Test retry only on specific exceptions."""
         call_count = 0
@@ -344,5 +418,101 @@ class TestRetryIntegration:
         assert state['counter'] == 2
 
 
+class TestCircuitBreaker:
+    """Test circuit breaker behavior."""
+    
+    def test_circuit_opens_after_threshold_and_fails_fast(self):
+        """Test an open circuit rejects calls without invoking the function."""
+        call_count = 0
+        
+        @circuit_breaker(failure_threshold=2, reset_timeout=60, exceptions=(ConnectionError,))
+        def downstream():
+            nonlocal call_count
+            call_count += 1
+            raise ConnectionError("Down")
+        
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                downstream()
+        
+        with pytest.raises(CircuitOpenError):
+            downstream()
+        
+        assert call_count == 2
+    
+    def test_circuit_half_open_probe_closes_on_success(self):
+        """Test a successful probe after the reset timeout closes the circuit."""
+        outcomes = [ConnectionError("Down"), "ok", "ok"]
+        
+        @circuit_breaker(failure_threshold=1, reset_timeout=0.05, exceptions=(ConnectionError,))
+        def downstream():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        with pytest.raises(ConnectionError):
+            downstream()
+        with pytest.raises(CircuitOpenError):
+            downstream()
+        
+        time.sleep(0.06)
+        assert downstream() == "ok"
+        assert downstream() == "ok"
+    
+    def test_nested_open_circuit_is_not_retried_or_counted(self):
+        """Test an inner open circuit fails fast through an outer retry_api_call."""
+        inner_calls = 0
+        
+        @circuit_breaker(failure_threshold=1, reset_timeout=60, exceptions=(ConnectionError,))
+        def detect():
+            nonlocal inner_calls
+            inner_calls += 1
+            raise ConnectionError("Down")
+        
+        @retry_api_call
+        def analyze():
+            return detect()
+        
+        with pytest.raises(ConnectionError):
+            detect()
+        
+        start_time = time.time()
+        with pytest.raises(CircuitOpenError):
+            analyze()
+        
+        # No backoff sleeps, no extra inner calls, no failure on the outer circuit
+        assert time.time() - start_time < 0.5
+        assert inner_calls == 1
+        assert analyze.circuit_breaker.failure_count == 0
+        assert analyze.circuit_breaker.state == analyze.circuit_breaker.CLOSED
+    
+    def test_network_circuit_ignores_local_file_errors(self, monkeypatch):
+        """Test local file errors in a network call don't open its circuit."""
+        import retry_utils
+        monkeypatch.setattr(retry_utils.time, 'sleep', lambda seconds: None)
+        
+        @retry_network_call
+        def fetch():
+            raise FileNotFoundError("missing.json")
+        
+        for _ in range(RetryConfig.CIRCUIT_FAILURE_THRESHOLD + 1):
+            with pytest.raises(FileNotFoundError):
+                fetch()
+        
+        assert fetch.circuit_breaker.failure_count == 0
+        assert fetch.circuit_breaker.state == fetch.circuit_breaker.CLOSED
+    
+    def test_circuit_ignores_unlisted_exceptions(self):
+        """Test exceptions outside the failure tuple don't open the circuit."""
+        @circuit_breaker(failure_threshold=1, reset_timeout=60, exceptions=(ConnectionError,))
+        def bad_input():
+            raise ValueError("Bad input")
+        
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                bad_input()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -38,13 +38,14 @@ except Exception:
 # Enhanced face comparison module
 try:
     from face_comparison import compare_passport_to_id, get_face_comparator
-    _have_face_comparison = True
+    # face_comparison imports OpenCV lazily, so availability follows cv2
+    _have_face_comparison = _have_opencv
 except Exception:
     _have_face_comparison = False
 
 # ID Card face detector
 try:
-    from id_face_detector import IDCardFaceDetector, compare_faces_advanced
+    from id_face_detector import get_id_face_detector, compare_faces_advanced
     _have_id_face_detector = True
 except Exception:
     _have_id_face_detector = False
@@ -648,7 +649,7 @@ def process_id_card_face(id_card_img, passport_img=None, save_extracted=True):
     Complete ID card face processing pipeline:
     1. Detect face on ID card with robust preprocessing
     2. Highlight detected face with dotted bounding box
-    3. Extract and resize face to passport dimensions
+    3. Extract face crops (the saved copy is passport-sized)
     4. Compare with passport photo if provided
     
     Args:
@@ -660,7 +661,7 @@ def process_id_card_face(id_card_img, passport_img=None, save_extracted=True):
         dict with keys:
             - faces_detected: Number of faces found
             - highlighted_img: ID card with dotted boxes around faces
-            - extracted_faces: List of passport-sized face PIL Images
+            - extracted_faces: List of face crop PIL Images
             - primary_face: Largest/primary detected face (PIL Image)
             - face_boxes: List of (x, y, w, h) tuples
             - detection_method: Method used for detection
@@ -683,8 +684,8 @@ def process_id_card_face(id_card_img, passport_img=None, save_extracted=True):
         }
     
     try:
-        # Initialize detector
-        detector = IDCardFaceDetector()
+        # Shared detector (models are loaded once per process)
+        detector = get_id_face_detector()
         
         # Process ID card
         save_path = 'temp_extracted_face.jpg' if save_extracted else None